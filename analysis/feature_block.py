@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Feature Block
+Збирання engineered features в один попередньо виділений масив
+
+Замість вставки кожної нової feature окремою колонкою DataFrame (що
+фрагментує frame, викликає повторні consolidation copies та
+PerformanceWarning) схема виходу відома заздалегідь: під неї виділяється
+один суцільний float масив, колонки заповнюються на місці, а DataFrame
+створюється один раз у кінці без копіювання.
+
+Використання:
+    from feature_block import FeatureBlock
+
+    block = FeatureBlock(["a_squared", "a_log"], index=df.index)
+    block["a_squared"] = df["a"] ** 2
+    block["a_log"] = np.log1p(df["a"])
+    df_full = pd.concat([df, block.to_frame()], axis=1)
+
+Магістерська робота: Outcome-based оцінка якості TypeScript коду
+Автор: Слабенко Костянтин Олегович
+Група: АС-202
+Одеський політехнічний національний університет
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureBlock:
+    """
+    Fixed schema of numeric features backed by one (n_rows, n_features)
+    array.
+
+    Columns are written in place with block[name] = values (or several
+    adjacent columns at once through region()); to_frame() wraps the
+    array as a single-block DataFrame without copying it. The array is
+    column-major, so every feature is one contiguous column, as pandas
+    stores it.
+    """
+
+    def __init__(self, columns, index=None, n_rows=None, dtype=float):
+        self.columns = list(columns)
+        if len(set(self.columns)) != len(self.columns):
+            raise ValueError("Feature names must be unique")
+        if index is None:
+            index = pd.RangeIndex(n_rows or 0)
+        self.index = index
+        self.values = np.empty((len(index), len(self.columns)), dtype=dtype, order="F")
+        self._position = {name: j for j, name in enumerate(self.columns)}
+        self._filled = np.zeros(len(self.columns), dtype=bool)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def keys(self):
+        return list(self.columns)
+
+    def __contains__(self, name):
+        return name in self._position
+
+    def __getitem__(self, name):
+        """Column view (filled or not) of one feature."""
+        return self.values[:, self._position[name]]
+
+    def __setitem__(self, name, values):
+        j = self._position[name]
+        self.values[:, j] = np.asarray(values, dtype=self.values.dtype)
+        self._filled[j] = True
+
+    def region(self, names):
+        """
+        Writable 2-D view of adjacent columns, for functions that fill
+        their outputs in place (e.g. an out= argument). The columns count
+        as filled.
+        """
+        names = list(names)
+        if not names:
+            return self.values[:, :0]
+        start = self._position[names[0]]
+        stop = start + len(names)
+        if self.columns[start:stop] != names:
+            raise ValueError("region() needs adjacent columns in schema order")
+        self._filled[start:stop] = True
+        return self.values[:, start:stop]
+
+    def to_frame(self):
+        """DataFrame over the block (no copy); every column must be filled."""
+        if not self._filled.all():
+            missing = [c for c, done in zip(self.columns, self._filled) if not done]
+            raise ValueError(f"Unfilled feature columns: {missing}")
+        return pd.DataFrame(
+            self.values, index=self.index, columns=self.columns, copy=False
+        )
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Matrix Statistics
+Матричні (векторизовані) статистичні обчислення для широких таблиць features
+
+Замість циклів по парах колонок (df[[a, b]].corr(), stats.pearsonr, ...)
+усі пари обчислюються кількома матричними добутками NumPy.
+
+Використання:
+    from matrix_stats import correlation_screen
+
+    screen = correlation_screen(df[features], df[targets], pvalues=True)
+    screen["r"]  # (n_features, n_targets), pairwise-complete Pearson r
+    screen["n"]  # кількість спільних не-NaN спостережень кожної пари
+    screen["p"]  # двосторонні p-values
+
+    tests = pairwise_tests(df[metrics], names=metrics)  # усі пари метрик
+    reject, adjusted = benjamini_hochberg(tests["p"], alpha=0.05)
+
+    # Тисячі features: матриця кореляцій обробляється тайлами
+    redundant = redundant_features(df[features], threshold=0.95)
+    pairs = significant_pairs(df[features], alpha=0.05, method="streaming")
+    vif = variance_inflation_factors(df[predictors])  # усі VIF одразу
+    partial = partial_correlation_matrix(df[metrics], controls=df[confounders])
+
+Магістерська робота: Outcome-based оцінка якості TypeScript коду
+Автор: Слабенко Костянтин Олегович
+Група: АС-202
+Одеський політехнічний національний університет
+"""
+
+import numpy as np
+
+
+def _as_matrix(data):
+    """2-D float array from a DataFrame, Series or array-like."""
+    if hasattr(data, "to_numpy"):
+        data = data.to_numpy(dtype=float)
+    data = np.asarray(data, dtype=float)
+    return data[:, None] if data.ndim == 1 else data
+
+
+def _first_valid(data):
+    """First non-NaN value of every column (0 for all-NaN columns)."""
+    valid = ~np.isnan(data)
+    rows = valid.argmax(axis=0)
+    pivot = data[rows, np.arange(data.shape[1])]
+    return np.where(valid.any(axis=0), pivot, 0.0)
+
+
+def correlation_tstat(r, n):
+    """t-statistic of Pearson r with n observations (n-2 df; ±inf at |r|=1)."""
+    r = np.asarray(r, dtype=float)
+    dof = np.asarray(n, dtype=float) - 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = r * np.sqrt(dof / np.maximum(1.0 - r * r, 0.0))
+    return np.where(dof > 0, t, np.nan)
+
+
+def correlation_pvalues(r, n):
+    """Two-sided p-values of Pearson r with n observations (t-test, n-2 df)."""
+    from scipy import stats
+
+    dof = np.asarray(n, dtype=float) - 2
+    with np.errstate(invalid="ignore"):
+        p = 2 * stats.t.sf(np.abs(correlation_tstat(r, n)), dof)
+    return np.where(dof > 0, p, np.nan)
+
+
+def fisher_interval(r, n, z_critical=1.96):
+    """
+    Confidence interval of Pearson r from Fisher's z = arctanh(r) with
+    standard error 1 / sqrt(n - 3); NaN where n <= 3.
+    """
+    r = np.asarray(r, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.arctanh(r)
+        se = np.where(n > 3, 1 / np.sqrt(n - 3), np.nan)
+    return np.tanh(z - z_critical * se), np.tanh(z + z_critical * se)
+
+
+def benjamini_hochberg(pvalues, alpha=0.05, m=None):
+    """
+    Benjamini-Hochberg FDR step-up over an array of p-values.
+
+    Returns (reject, adjusted) with the shape of pvalues. NaN p-values
+    (untestable pairs) are left out of the family: their adjusted value is
+    NaN and they are never rejected.
+
+    m is the family size when pvalues holds only the smallest p-values of
+    a larger family (see StreamingBH): rejections stay exact, and so do
+    the adjusted values of rejected tests.
+    """
+    pvalues = np.asarray(pvalues, dtype=float)
+    flat = pvalues.ravel()
+    valid = np.flatnonzero(~np.isnan(flat))
+    m = len(valid) if m is None else max(int(m), len(valid))
+
+    adjusted = np.full(flat.shape, np.nan)
+    if len(valid):
+        order = valid[np.argsort(flat[valid], kind="mergesort")]
+        scaled = flat[order] * m / np.arange(1, len(order) + 1)
+        # Step-up: running minimum from the largest p-value down
+        adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+
+    adjusted = adjusted.reshape(pvalues.shape)
+    with np.errstate(invalid="ignore"):
+        reject = adjusted <= alpha
+    return reject, adjusted
+
+
+class StreamingBH:
+    """
+    Benjamini-Hochberg over p-values that arrive in chunks, in memory
+    independent of the number of tests.
+
+    The first pass only counts p-values in log-spaced bins. bracket() then
+    gives (low, high): BH rejects every p <= low and no p > high, because a
+    bin can only hold a rejected p if its lower edge is below
+    alpha * #{p <= upper edge} / m. A second pass that keeps just the
+    p-values <= high and runs benjamini_hochberg(..., m=self.m) on them
+    reproduces the full BH result exactly.
+    """
+
+    def __init__(self, alpha=0.05, bins=4096):
+        self.alpha = alpha
+        # Bin b holds (edges[b-1], edges[b]]; bin 0 holds exact zeros
+        self.edges = np.concatenate([[0.0], np.logspace(-300, 0, bins)])
+        self.counts = np.zeros(len(self.edges), dtype=np.int64)
+
+    def update(self, pvalues):
+        """Count a chunk of p-values (NaN are not part of the family)."""
+        p = np.asarray(pvalues, dtype=float).ravel()
+        p = p[~np.isnan(p)]
+        bins = np.minimum(np.searchsorted(self.edges, p), len(self.edges) - 1)
+        self.counts += np.bincount(bins, minlength=len(self.edges))
+        return self
+
+    @property
+    def m(self):
+        """Number of (non-NaN) tests seen."""
+        return int(self.counts.sum())
+
+    def bracket(self):
+        """(low, high) bounds of the BH rejection cutoff."""
+        below = np.cumsum(self.counts)
+        m = max(self.m, 1)
+        low = self.edges[np.flatnonzero(self.edges * m <= self.alpha * below)[-1]]
+        open_bins = np.flatnonzero(self.edges[:-1] * m < self.alpha * below[1:]) + 1
+        high = self.edges[open_bins[-1]] if len(open_bins) else low
+        return low, max(low, high)
+
+
+class PairwiseCorrelation:
+    """
+    Pairwise-complete Pearson correlation of every X column with every Y
+    column, accumulated over row chunks.
+
+    For each (x, y) pair only rows where both are non-NaN count, as in
+    DataFrame.corr(). The masked sums n, Sx, Sy, Sxx, Syy and Sxy of all
+    pairs are matrix products of the zero-filled columns and their masks.
+    Values are shifted by a per-column pivot (the first valid value of the
+    first chunk) to avoid cancellation, so constant columns give exactly
+    zero variance and NaN correlation.
+    """
+
+    def __init__(self):
+        self.pivot_x = None
+        self.pivot_y = None
+        self.sums = None
+
+    def update(self, X, Y):
+        """Add a chunk of rows (X and Y must have the same rows)."""
+        X = _as_matrix(X)
+        Y = _as_matrix(Y)
+        if self.pivot_x is None:
+            self.pivot_x = _first_valid(X)
+            self.pivot_y = _first_valid(Y)
+
+        mask_x = (~np.isnan(X)).astype(float)
+        mask_y = (~np.isnan(Y)).astype(float)
+        x = np.where(mask_x > 0, X - self.pivot_x, 0.0)
+        y = np.where(mask_y > 0, Y - self.pivot_y, 0.0)
+
+        chunk = {
+            "n": mask_x.T @ mask_y,
+            "sx": x.T @ mask_y,
+            "sy": mask_x.T @ y,
+            "sxx": (x * x).T @ mask_y,
+            "syy": mask_x.T @ (y * y),
+            "sxy": x.T @ y,
+        }
+        if self.sums is None:
+            self.sums = chunk
+        else:
+            for key, value in chunk.items():
+                self.sums[key] += value
+        return self
+
+    def result(self, pvalues=False):
+        """
+        Dict with "r" and "n" arrays of shape (n_x, n_y), plus "p" if
+        pvalues. r is NaN where a pair has fewer than 2 common rows or one
+        side is constant over them.
+        """
+        s = self.sums
+        n = s["n"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = s["sxy"] - s["sx"] * s["sy"] / n
+            var_x = s["sxx"] - s["sx"] * s["sx"] / n
+            var_y = s["syy"] - s["sy"] * s["sy"] / n
+            denominator = np.sqrt(var_x * var_y)
+            r = np.where((n >= 2) & (denominator > 0), cov / denominator, np.nan)
+        r = np.clip(r, -1.0, 1.0)
+
+        result = {"r": r, "n": n.astype(np.int64)}
+        if pvalues:
+            result["p"] = correlation_pvalues(r, n)
+        return result
+
+
+def correlation_matrix(X, pvalues=False):
+    """
+    Full pairwise-complete correlation matrix of the X columns in one pass
+    (same dict as PairwiseCorrelation.result(), with square arrays).
+    """
+    X = _as_matrix(X)
+    return PairwiseCorrelation().update(X, X).result(pvalues=pvalues)
+
+
+def correlation_tiles(X, block=256, upper=True):
+    """
+    Stream the correlation matrix of the X columns in row tiles.
+
+    Yields (start, col_start, r, n) where r and n (pairwise-complete, as
+    in correlation_matrix()) have shape (rows, p - col_start) for columns
+    start .. start + rows of X. With upper=True tiles start at the
+    diagonal (col_start == start), otherwise they span every column.
+    Peak memory is O(block * p) instead of O(p^2).
+    """
+    X = _as_matrix(X)
+    p = X.shape[1]
+    for start in range(0, p, block):
+        stop = min(start + block, p)
+        col_start = start if upper else 0
+        tile = PairwiseCorrelation().update(X[:, start:stop], X[:, col_start:])
+        result = tile.result()
+        yield start, col_start, result["r"], result["n"]
+
+
+def _upper_pairs(start, col_start, shape):
+    """Row-major (i, j) column indices of the strict upper triangle of a tile."""
+    rows = start + np.arange(shape[0])
+    cols = col_start + np.arange(shape[1])
+    return np.nonzero(rows[:, None] < cols[None, :])
+
+
+def _pair_columns(i, j, names):
+    """Pair identifiers: column indices, or column names if given."""
+    if names is None:
+        return {"i": i, "j": j}
+    names = np.asarray(list(names), dtype=object)
+    return {"name_i": names[i], "name_j": names[j]}
+
+
+def _concat_pairs(parts, keys):
+    """Concatenate per-tile dicts of 1-D arrays into one columnar dict."""
+    return {
+        key: (
+            np.concatenate([part[key] for part in parts])
+            if parts
+            else np.zeros(0, dtype=np.int64 if key in ("i", "j", "n") else float)
+        )
+        for key in keys
+    }
+
+
+def _tile_pairs(X, block, keep=None):
+    """
+    Upper-triangle pairs of every tile as a columnar dict with i, j, r, n
+    and p; keep(r, p) optionally filters pairs inside each tile.
+    """
+    parts = []
+    for start, col_start, r, n in correlation_tiles(X, block):
+        a, b = _upper_pairs(start, col_start, r.shape)
+        pair = {
+            "i": start + a,
+            "j": col_start + b,
+            "r": r[a, b],
+            "n": n[a, b],
+        }
+        pair["p"] = correlation_pvalues(pair["r"], pair["n"])
+        if keep is not None:
+            mask = keep(pair["r"], pair["p"])
+            pair = {key: value[mask] for key, value in pair.items()}
+        parts.append(pair)
+    return _concat_pairs(parts, ("i", "j", "r", "n", "p"))
+
+
+def pairwise_tests(X, names=None, z_critical=1.96, block=256):
+    """
+    Correlation tests of every column pair of X (upper triangle, in
+    itertools.combinations order) as columnar arrays.
+
+    The matrix is computed tile by tile (correlation_tiles()); r, n,
+    t-statistic, two-sided p-value and the Fisher-z confidence interval of
+    all pairs follow from array operations. Returns a dict of 1-D arrays:
+    "i", "j" (column indices, or "name_i", "name_j" if names are given),
+    "r", "n", "t", "p", "ci_lower" and "ci_upper".
+    """
+    pairs = _tile_pairs(X, block)
+    ci_lower, ci_upper = fisher_interval(pairs["r"], pairs["n"], z_critical)
+
+    tests = _pair_columns(pairs["i"], pairs["j"], names)
+    tests.update(
+        {
+            "r": pairs["r"],
+            "n": pairs["n"],
+            "t": correlation_tstat(pairs["r"], pairs["n"]),
+            "p": pairs["p"],
+            "ci_lower": ci_lower,
+            "ci_upper": ci_upper,
+        }
+    )
+    return tests
+
+
+def correlated_pairs(X, threshold=None, top_k=None, names=None, block=256):
+    """
+    Strongly correlated column pairs of X without the dense p x p matrix.
+
+    threshold keeps upper-triangle pairs (i < j) with |r| > threshold.
+    top_k keeps, for every column i, its top_k partners j != i by |r|
+    (pairs then appear once per side, sorted by i and descending |r|);
+    with both, the top_k are taken among pairs above threshold. Returns a
+    columnar dict with i, j (or name_i, name_j), r and n.
+    """
+    X = _as_matrix(X)
+    if threshold is None and top_k is None:
+        raise ValueError("correlated_pairs needs a threshold or top_k")
+
+    parts = []
+    for start, col_start, r, n in correlation_tiles(X, block, upper=top_k is None):
+        strength = np.abs(r)
+        if top_k is None:
+            a, b = _upper_pairs(start, col_start, r.shape)
+            mask = strength[a, b] > threshold
+            a, b = a[mask], b[mask]
+        else:
+            rows = np.arange(r.shape[0])
+            strength = np.where(np.isnan(strength), -np.inf, strength)
+            strength[rows, start + rows - col_start] = -np.inf
+            if threshold is not None:
+                strength[strength <= threshold] = -np.inf
+            k = min(top_k, strength.shape[1])
+            best = np.argpartition(-strength, k - 1, axis=1)[:, :k]
+            order = np.argsort(
+                -np.take_along_axis(strength, best, axis=1), axis=1, kind="stable"
+            )
+            best = np.take_along_axis(best, order, axis=1)
+            a = np.repeat(rows, k)
+            b = best.ravel()
+            mask = np.isfinite(strength[a, b])
+            a, b = a[mask], b[mask]
+        parts.append({"i": start + a, "j": col_start + b, "r": r[a, b], "n": n[a, b]})
+
+    pairs = _concat_pairs(parts, ("i", "j", "r", "n"))
+    result = _pair_columns(pairs["i"], pairs["j"], names)
+    result.update({"r": pairs["r"], "n": pairs["n"]})
+    return result
+
+
+def redundant_features(X, threshold=0.95, block=256):
+    """
+    Indices of columns correlated above threshold (|r|) with any earlier
+    column - the columns of the upper triangle of |corr| with a value over
+    threshold - computed from tiles of the correlation matrix.
+    """
+    pairs = correlated_pairs(X, threshold=threshold, block=block)
+    return np.unique(pairs["j"])
+
+
+def significant_pairs(X, alpha=0.05, names=None, method="streaming", block=256):
+    """
+    Column pairs of X whose correlation is significant under
+    Benjamini-Hochberg FDR over all p * (p - 1) / 2 pairs.
+
+    method="exact" keeps every pair's p-value and runs
+    benjamini_hochberg() once (O(p^2) memory). method="streaming" makes
+    two passes over correlation_tiles(): the first only feeds StreamingBH,
+    the second keeps the pairs up to its upper cutoff bound, so memory is
+    O(p * block) plus the (near-)significant pairs. Both give the same
+    result: a columnar dict with i, j (or name_i, name_j), r, n, p and
+    "p_adjusted" of the rejected pairs, in upper-triangle order.
+    """
+    X = _as_matrix(X)
+    if method == "exact":
+        pairs = _tile_pairs(X, block)
+        m = None
+    elif method == "streaming":
+        bh = StreamingBH(alpha)
+        for start, col_start, r, n in correlation_tiles(X, block):
+            a, b = _upper_pairs(start, col_start, r.shape)
+            bh.update(correlation_pvalues(r[a, b], n[a, b]))
+        _, high = bh.bracket()
+        pairs = _tile_pairs(X, block, keep=lambda r, p: p <= high)
+        m = bh.m
+    else:
+        raise ValueError(f"Unknown BH method: {method}")
+
+    reject, adjusted = benjamini_hochberg(pairs["p"], alpha, m=m)
+    result = _pair_columns(pairs["i"][reject], pairs["j"][reject], names)
+    result.update({key: pairs[key][reject] for key in ("r", "n", "p")})
+    result["p_adjusted"] = adjusted[reject]
+    return result
+
+
+def partial_correlation_matrix(X, controls=None, shrinkage=0.0, condition_on_rest=True):
+    """
+    Partial correlations of every pair of X columns given the controls.
+
+    The controls (with an intercept) are projected out of all X columns in
+    one least-squares solve. With condition_on_rest=True each pair is also
+    conditioned on the remaining X columns: the residual correlation
+    matrix is inverted once (pseudo-inverse if singular) and the precision
+    matrix P is scaled to r_ij = -P_ij / sqrt(P_ii * P_jj). With
+    condition_on_rest=False r is the correlation of the residuals (each
+    pair given the controls only, as two residualizing regressions per
+    pair would give).
+
+    shrinkage pulls the residual correlation matrix towards the identity
+    before inversion, (1 - s) * R + s * I, which keeps the precision
+    matrix stable when the number of columns approaches n; "auto" picks
+    the Ledoit-Wolf intensity (scikit-learn). p-values then are
+    approximate.
+
+    Rows with NaN in any column are dropped. Returns a dict with square
+    "r" and "p" arrays, "n" (rows used) and "dof" (n - 2 - number of
+    conditioning variables).
+    """
+    X = _as_matrix(X)
+    Z = np.zeros((len(X), 0)) if controls is None else _as_matrix(controls)
+    complete = ~(np.isnan(X).any(axis=1) | np.isnan(Z).any(axis=1))
+    X, Z = X[complete], Z[complete]
+    n, p = X.shape
+
+    design = np.column_stack([np.ones(n), Z])
+    coefficients, _, rank, _ = np.linalg.lstsq(design, X, rcond=None)
+    residuals = X - design @ coefficients
+
+    scale = np.sqrt((residuals * residuals).sum(axis=0))
+    # Residual norms at round-off level of the raw column count as zero
+    varying = scale > np.sqrt(np.finfo(float).eps) * np.sqrt((X * X).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        standardized = np.where(varying, residuals / scale, 0.0)
+    corr = standardized.T @ standardized
+
+    if shrinkage == "auto":
+        from sklearn.covariance import ledoit_wolf_shrinkage
+
+        shrinkage = ledoit_wolf_shrinkage(standardized * np.sqrt(n))
+    if shrinkage:
+        corr = (1.0 - shrinkage) * corr + shrinkage * np.eye(p)
+
+    n_conditioning = rank - 1
+    if condition_on_rest:
+        precision = np.linalg.pinv(corr, hermitian=True)
+        diagonal = np.sqrt(np.diag(precision))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = -precision / np.outer(diagonal, diagonal)
+        n_conditioning += p - 2
+    else:
+        r = corr
+    r = np.clip(r, -1.0, 1.0)
+    np.fill_diagonal(r, 1.0)
+    # Columns without residual variance have no partial correlation
+    r[~varying] = np.nan
+    r[:, ~varying] = np.nan
+
+    dof = n - 2 - n_conditioning
+    p_values = correlation_pvalues(r, np.full(r.shape, dof + 2))
+    np.fill_diagonal(p_values, np.nan)
+    return {"r": r, "p": p_values, "n": n, "dof": dof}
+
+
+# statsmodels clips the auxiliary R^2 at 1 - 1e-15, so exactly collinear
+# columns report this VIF instead of inf
+MAX_VIF = 1.0 / (1.0 - (1.0 - 1e-15))
+
+
+def variance_inflation_factors(X, center=True, rcond=None):
+    """
+    VIF of every column of X from one eigendecomposition of the predictor
+    correlation matrix: VIF_i = [R^-1]_ii = 1 / (1 - R_i^2) of the
+    regression of column i on all other columns.
+
+    center=True matches statsmodels variance_inflation_factor(X, i) (which
+    standardizes the columns since 0.15); center=False correlates the raw
+    columns about zero, as its older unstandardized path did for X without
+    a constant column.
+
+    Near-singular cases are flagged as statsmodels does: eigenvalues below
+    rcond * largest (default p * eps) are exact linear dependencies, and
+    the columns loading on them get MAX_VIF; the other columns get their
+    VIF from the pseudo-inverse, and every VIF is clipped to
+    [1, MAX_VIF]. Columns without variance get 1.
+    """
+    X = _as_matrix(X)
+    if np.isnan(X).any():
+        raise ValueError("VIF needs complete rows (X contains NaN)")
+    if center:
+        X = X - X.mean(axis=0)
+
+    gram = X.T @ X
+    norms = np.sqrt(np.diag(gram))
+    valid = norms > 0
+    vif = np.ones(X.shape[1])
+    p = int(valid.sum())
+    if p == 0:
+        return vif
+
+    scale = norms[valid]
+    corr = gram[np.ix_(valid, valid)] / np.outer(scale, scale)
+    eigenvalues, eigenvectors = np.linalg.eigh(corr)
+
+    if rcond is None:
+        rcond = p * np.finfo(float).eps
+    singular = eigenvalues <= rcond * max(eigenvalues[-1], 0.0)
+
+    loadings = eigenvectors * eigenvectors
+    inverse_diagonal = loadings[:, ~singular] @ (1.0 / eigenvalues[~singular])
+    dependent = (loadings[:, singular] > np.sqrt(rcond)).any(axis=1)
+    vif[valid] = np.where(dependent, MAX_VIF, inverse_diagonal)
+    return np.clip(vif, 1.0, MAX_VIF)
+
+
+def correlation_screen(X, Y, pvalues=False):
+    """
+    Pairwise-complete correlation of every feature (X columns) with every
+    target (Y columns) in one pass; see PairwiseCorrelation.
+    """
+    return PairwiseCorrelation().update(X, Y).result(pvalues=pvalues)
@@ -30,6 +30,8 @@ import xgboost as xgb
 import lightgbm as lgb
 import shap
 
+from matrix_stats import redundant_features
+
 warnings.filterwarnings("ignore")
 
 # Налаштування візуалізації
@@ -118,13 +120,10 @@ else:
     print("✓ Leaked features НЕ виявлено")
 print()
 
-# Видалити highly correlated features (correlation > 0.95)
-corr_matrix = df[feature_cols].corr().abs()
-upper_triangle = corr_matrix.where(
-    np.triu(np.ones(corr_matrix.shape), k=1).astype(bool)
-)
+# Видалити highly correlated features (correlation > 0.95): пізніша колонка
+# кожної пари; матриця кореляцій обробляється тайлами, без dense p×p
 to_drop = [
-    column for column in upper_triangle.columns if any(upper_triangle[column] > 0.95)
+    feature_cols[k] for k in redundant_features(df[feature_cols], threshold=0.95)
 ]
 
 print(f"✓ Видалено {len(to_drop)} highly correlated features (r > 0.95)")
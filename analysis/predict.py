@@ -12,47 +12,363 @@ ML Prediction Script
     # What-if аналіз:
     python predict.py '{"metrics": {...}, "whatif": {"dx_codeReviewDuration": 24}}'
 
+    # Сітка what-if сценаріїв (декартів добуток діапазонів метрик):
+    python predict.py '{"metrics": {...}, "sweep": {"dx_codeReviewDuration":
+        {"start": 12, "stop": 96, "num": 50}, "tp_testCoverage": [60, 80, 95]}}'
+
+    # Чутливість (похідні та еластичності) і пошук оптимальних змін:
+    python predict.py '{"metrics": {...}, "sensitivity": true}'
+    python predict.py '{"metrics": {...}, "optimize": {"target": "timeToMarket",
+        "budget": 0.3, "metrics": ["dx_codeReviewDuration", "tp_testCoverage"]}}'
+
+    # Пакетне передбачення (JSON-масив або metrics_report.json):
+    python predict.py --batch ../reports/metrics_report.json
+
+    # Згорнути моделі та scalers у linear_kernel.npz / linear_kernel.json
+    # (активної версії або --model-version):
+    python predict.py --export-kernel
+
+    # Закріпити версію моделей з реєстру (замість ACTIVE):
+    python predict.py --model-version 3f2a9c1d0b7e '{...}'
+
+    # Кеш передбачень між запусками (LRU, ключ - метрики + версія моделей):
+    python predict.py --cache-file /tmp/predict_cache.json --cache-size 5000 '{...}'
+
+    # Час імпорту, завантаження та передбачення:
+    python predict.py --timings '{"developerExperience": {...}, ...}'
+
+    # Довготривалий режим (JSON-lines через stdin/stdout):
+    python predict.py --serve
+    > {"id": 1, "type": "predict", "metrics": {...}}
+    > {"id": 2, "type": "whatif", "metrics": {...}, "whatif": {...}}
+    > {"id": 3, "type": "batch", "projects": [{...}, {...}]}
+    > {"id": 4, "type": "sweep", "metrics": {...}, "sweep": {...}}
+
 Магістерська робота: Outcome-based оцінка якості TypeScript коду
 Автор: Слабенко Костянтин Олегович
 Група: АС-202
 Одеський політехнічний національний університет
 """
 
+import os
 import sys
 import json
+import math
+import hashlib
+import importlib
+import time
 import warnings
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-import numpy as np
-import joblib
+
+# numpy, joblib and (through unpickling) sklearn are imported lazily, so a
+# single prediction from the slim kernel starts without them
+MODULE_LOADED = time.perf_counter()
+IMPORT_TIMINGS = {}
 
 warnings.filterwarnings("ignore")
 
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 MODELS_DIR = SCRIPT_DIR / ".." / "reports" / "ml" / "saved_models"
+# Model registry: immutable versions/<id>/ directories written by
+# train_and_save_models.py and an ACTIVE pointer file holding the id of the
+# version in use. Without ACTIVE, the flat saved_models/ layout is used.
+VERSIONS_DIR_NAME = "versions"
+ACTIVE_POINTER = "ACTIVE"
+KERNEL_FILE = "linear_kernel.npz"
+SLIM_KERNEL_FILE = "linear_kernel.json"
+
+
+def lazy_import(name):
+    """Import a heavy module on first use and record how long it took."""
+    module = sys.modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_TIMINGS[name] = round((time.perf_counter() - started) * 1000, 3)
+    return module
+
+
+class LinearKernel:
+    """
+    All target models folded into one dense linear map.
+
+    Row t of weights holds the coefficients of target t with its scaler
+    already folded in, so prediction is X @ weights.T + bias. Weights may be
+    plain lists (slim JSON artifact) or arrays; single-row scoring runs in
+    pure Python and needs no numpy.
+    """
+
+    def __init__(self, targets, features, weights, bias):
+        self.targets = list(targets)
+        self.features = list(features)
+        self.weights = weights
+        self.bias = bias
+        self._arrays = None
+
+        # Resolve feature names once (see compile_feature_plan)
+        self.sources = [resolve_feature_name(f) for f in self.features]
+        self.missing = [f for f, src in zip(self.features, self.sources) if not src]
+        self.defaults = [FEATURE_DEFAULTS.get(f, 0) for f in self.features]
+
+    def predict_all(self, X):
+        """Return an (n_samples, n_targets) prediction matrix."""
+        if self._arrays is None:
+            np = lazy_import("numpy")
+            self._arrays = (
+                np.asarray(self.weights, dtype=float),
+                np.asarray(self.bias, dtype=float),
+            )
+        weights, bias = self._arrays
+        return X @ weights.T + bias
+
+    def predict_one(self, all_features):
+        """Score one engineer_features() dict. Returns {target: value}."""
+        values = [
+            all_features[src] if src else default
+            for src, default in zip(self.sources, self.defaults)
+        ]
+        return {
+            target: float(self.bias[t])
+            + math.fsum(float(w) * v for w, v in zip(self.weights[t], values))
+            for t, target in enumerate(self.targets)
+        }
+
+
+def fold_linear_model(model, scaler=None):
+    """
+    Fold an optional StandardScaler into a linear model's coefficients.
+
+    model(scaler(x)) == x @ weights + bias for the returned (weights, bias).
+    """
+    np = lazy_import("numpy")
+
+    if not hasattr(model, "coef_") or not hasattr(model, "intercept_"):
+        raise ValueError(f"{type(model).__name__} is not a linear model")
+
+    weights = np.ravel(model.coef_).astype(float)
+    bias = float(np.ravel(model.intercept_)[0])
+
+    if scaler is not None:
+        scale = getattr(scaler, "scale_", None)
+        mean = getattr(scaler, "mean_", None)
+        if scale is not None:
+            weights = weights / scale
+        if mean is not None and getattr(scaler, "with_mean", True):
+            bias -= float(weights @ mean)
+
+    return weights, bias
+
+
+def _model_files_digest(models_dir, metadata):
+    """Hash the saved model/scaler files a kernel was folded from."""
+    digest = hashlib.sha256()
+    for target in metadata["targets"]:
+        names = [f"{target}_model.joblib"]
+        if metadata["models"][target]["needs_scaling"]:
+            names.append(f"{target}_scaler.joblib")
+        for name in names:
+            digest.update((Path(models_dir) / name).read_bytes())
+    return digest.hexdigest()
+
+
+def export_linear_kernel(models_dir=None, version=None, models_root=MODELS_DIR):
+    """
+    Fold the saved sklearn models and scalers into linear_kernel.npz.
+
+    The file holds a (n_targets x n_features) weight matrix, a bias vector
+    and the target/feature names, so serving needs no sklearn objects.
+    The same data is written as plain JSON lists to linear_kernel.json,
+    which the fast-start path loads without importing numpy.
+
+    By default the kernel is written next to the models that are served
+    from models_root: the pinned version, else ACTIVE, else the flat
+    layout (see resolve_models_dir()).
+    """
+    np = lazy_import("numpy")
+    joblib = lazy_import("joblib")
+
+    if models_dir is None:
+        models_dir, _ = resolve_models_dir(version, models_root)
+    models_dir = Path(models_dir)
+    with open(models_dir / "metadata.json", "r") as f:
+        metadata = json.load(f)
+    with open(models_dir / "feature_list.json", "r") as f:
+        feature_list = json.load(f)
+
+    weights = []
+    bias = []
+    for target in metadata["targets"]:
+        model = joblib.load(models_dir / f"{target}_model.joblib")
+        scaler = None
+        if metadata["models"][target]["needs_scaling"]:
+            scaler = joblib.load(models_dir / f"{target}_scaler.joblib")
+
+        target_weights, target_bias = fold_linear_model(model, scaler)
+        weights.append(target_weights)
+        bias.append(target_bias)
+
+    source_digest = _model_files_digest(models_dir, metadata)
+
+    kernel_path = models_dir / KERNEL_FILE
+    np.savez(
+        kernel_path,
+        targets=np.array(metadata["targets"]),
+        features=np.array(feature_list),
+        weights=np.vstack(weights),
+        bias=np.array(bias),
+        source_digest=np.array(source_digest),
+    )
+
+    with open(models_dir / SLIM_KERNEL_FILE, "w") as f:
+        json.dump(
+            {
+                "targets": metadata["targets"],
+                "features": feature_list,
+                "weights": [w.tolist() for w in weights],
+                "bias": bias,
+                "source_digest": source_digest,
+            },
+            f,
+        )
+
+    return kernel_path
+
+
+def load_kernel(feature_list, metadata, models_dir=MODELS_DIR):
+    """
+    Load the exported kernel if it exists and matches the saved models.
+
+    The slim linear_kernel.json is preferred (no numpy needed); the .npz
+    export is used when only it is present.
+    """
+    slim_path = Path(models_dir) / SLIM_KERNEL_FILE
+    kernel_path = Path(models_dir) / KERNEL_FILE
+
+    if slim_path.exists():
+        with open(slim_path, "r") as f:
+            data = json.load(f)
+        kernel = LinearKernel(
+            data["targets"], data["features"], data["weights"], data["bias"]
+        )
+        source_digest = data["source_digest"]
+    elif kernel_path.exists():
+        np = lazy_import("numpy")
+        with np.load(kernel_path, allow_pickle=False) as data:
+            kernel = LinearKernel(
+                data["targets"].tolist(),
+                data["features"].tolist(),
+                data["weights"],
+                data["bias"],
+            )
+            source_digest = str(data["source_digest"])
+    else:
+        return None
+
+    # Stale export (models retrained since): fall back to the sklearn models
+    if kernel.features != list(feature_list) or set(kernel.targets) != set(
+        metadata["targets"]
+    ):
+        return None
+    if source_digest != _model_files_digest(models_dir, metadata):
+        return None
+    return kernel
 
 
-def load_models():
-    """Load all saved models and metadata."""
+def active_version(models_root=MODELS_DIR):
+    """Return the version id the ACTIVE pointer selects, or None."""
     try:
+        version = (Path(models_root) / ACTIVE_POINTER).read_text().strip()
+    except OSError:
+        return None
+    return version or None
+
+
+def activate_version(version, models_root=MODELS_DIR):
+    """Atomically point ACTIVE at an existing registry version."""
+    models_root = Path(models_root)
+    if not (models_root / VERSIONS_DIR_NAME / version / "metadata.json").exists():
+        raise ValueError(f"Unknown model version: {version}")
+
+    tmp_path = models_root / f".{ACTIVE_POINTER}.{os.getpid()}.tmp"
+    tmp_path.write_text(version + "\n")
+    os.replace(tmp_path, models_root / ACTIVE_POINTER)
+
+
+def resolve_models_dir(version=None, models_root=MODELS_DIR):
+    """
+    Directory to load models from: the pinned version, else the ACTIVE
+    version, else the flat legacy layout. Returns (path, version).
+    """
+    models_root = Path(models_root)
+    if version is None:
+        version = active_version(models_root)
+    if version is None:
+        return models_root, None
+
+    version_dir = models_root / VERSIONS_DIR_NAME / version
+    if not version_dir.is_dir():
+        raise ValueError(f"Unknown model version: {version}")
+    return version_dir, version
+
+
+def model_fingerprint(models_dir, metadata):
+    """
+    Identify the loaded models: the registry version id, or for the flat
+    layout a digest of its metadata, feature list and model files.
+    """
+    if metadata.get("version"):
+        return metadata["version"]
+
+    digest = hashlib.sha256(_model_files_digest(models_dir, metadata).encode())
+    for name in ("metadata.json", "feature_list.json"):
+        digest.update((Path(models_dir) / name).read_bytes())
+    return "flat-" + digest.hexdigest()[:12]
+
+
+def load_models(use_kernel=True, version=None):
+    """
+    Load all saved models and metadata.
+
+    version pins a registry version; by default the ACTIVE one is used
+    (or the flat layout if there is no registry). metadata["version"] holds
+    the loaded version id (None for the flat layout).
+
+    If an exported kernel exists (see export_linear_kernel) and use_kernel
+    is set, the folded LinearKernel is returned in place of the models dict
+    and scalers is None, so no sklearn objects are unpickled.
+    """
+    try:
+        models_dir, version = resolve_models_dir(version)
+
         # Load metadata
-        with open(MODELS_DIR / "metadata.json", "r") as f:
+        with open(models_dir / "metadata.json", "r") as f:
             metadata = json.load(f)
+        metadata["version"] = version
+        metadata["fingerprint"] = model_fingerprint(models_dir, metadata)
 
         # Load feature list
-        with open(MODELS_DIR / "feature_list.json", "r") as f:
+        with open(models_dir / "feature_list.json", "r") as f:
             feature_list = json.load(f)
 
+        if use_kernel:
+            kernel = load_kernel(feature_list, metadata, models_dir)
+            if kernel is not None:
+                return kernel, None, feature_list, metadata
+
         # Load models and scalers
+        joblib = lazy_import("joblib")
         models = {}
         scalers = {}
 
         for target in metadata["targets"]:
-            model_path = MODELS_DIR / f"{target}_model.joblib"
+            model_path = models_dir / f"{target}_model.joblib"
             models[target] = joblib.load(model_path)
 
             if metadata["models"][target]["needs_scaling"]:
-                scaler_path = MODELS_DIR / f"{target}_scaler.joblib"
+                scaler_path = models_dir / f"{target}_scaler.joblib"
                 scalers[target] = joblib.load(scaler_path)
             else:
                 scalers[target] = None
@@ -63,6 +379,23 @@ def load_models():
         return None, None, None, {"error": f"Failed to load models: {str(e)}"}
 
 
+def _is_number(value):
+    """Numeric and not NaN (NaN metrics do not count towards averages)."""
+    return isinstance(value, (int, float)) and not math.isnan(value)
+
+
+def _log1p(x):
+    """
+    math.log1p with the domain behaviour of np.log1p (used by the batch
+    path): -inf at -1 and NaN below it instead of a ValueError.
+    """
+    if x == -1:
+        return float("-inf")
+    if x < -1:
+        return float("nan")
+    return math.log1p(x)
+
+
 def engineer_features(raw_metrics):
     """
     Engineer features from raw metrics to match training data format.
@@ -115,26 +448,21 @@ def engineer_features(raw_metrics):
     features["bi_deploymentFrequency"] = bi.get("deploymentFrequency", 0)
     features["bi_changeFailureRate"] = bi.get("changeFailureRate", 0)
 
-    # Category averages
+    # Category averages (non-numeric and NaN values are skipped, as in
+    # engineer_features_columnar())
     dx_values = [
-        v
-        for k, v in features.items()
-        if k.startswith("dx_") and isinstance(v, (int, float))
+        v for k, v in features.items() if k.startswith("dx_") and _is_number(v)
     ]
     tp_values = [
-        v
-        for k, v in features.items()
-        if k.startswith("tp_") and isinstance(v, (int, float))
+        v for k, v in features.items() if k.startswith("tp_") and _is_number(v)
     ]
     bi_values = [
-        v
-        for k, v in features.items()
-        if k.startswith("bi_") and isinstance(v, (int, float))
+        v for k, v in features.items() if k.startswith("bi_") and _is_number(v)
     ]
 
-    features["avg_dx"] = np.mean(dx_values) if dx_values else 0
-    features["avg_tp"] = np.mean(tp_values) if tp_values else 0
-    features["avg_bi"] = np.mean(bi_values) if bi_values else 0
+    features["avg_dx"] = sum(dx_values) / len(dx_values) if dx_values else 0
+    features["avg_tp"] = sum(tp_values) / len(tp_values) if tp_values else 0
+    features["avg_bi"] = sum(bi_values) / len(bi_values) if bi_values else 0
 
     # Interaction features (based on research findings)
     features["dx_tp_interaction"] = features["avg_dx"] * features["avg_tp"]
@@ -146,8 +474,8 @@ def engineer_features(raw_metrics):
     features["tp_testCoverage_squared"] = features["tp_testCoverage"] ** 2
 
     # Log transformations (for skewed metrics)
-    features["dx_codeReviewDuration_log"] = np.log1p(features["dx_codeReviewDuration"])
-    features["tp_bundleSize_log"] = np.log1p(features["tp_bundleSize"])
+    features["dx_codeReviewDuration_log"] = _log1p(features["dx_codeReviewDuration"])
+    features["tp_bundleSize_log"] = _log1p(features["tp_bundleSize"])
 
     # Ratio features
     if features["tp_bundleSize"] > 0:
@@ -167,48 +495,414 @@ def engineer_features(raw_metrics):
     return features
 
 
-def predict(metrics, models, scalers, feature_list):
-    """Make predictions using loaded models."""
-    # Engineer features
-    all_features = engineer_features(metrics)
+TARGETS = ["overallScore", "timeToMarket", "communityGrowth"]
 
-    # Create feature vector in correct order
-    feature_vector = []
+
+# Raw metrics in the same order engineer_features() extracts them:
+# (feature name, metrics category, metric key)
+RAW_METRICS = [
+    ("dx_codeReviewDuration", "developerExperience", "codeReviewDuration"),
+    ("dx_debuggingTime", "developerExperience", "debuggingTime"),
+    ("dx_buildTime", "developerExperience", "buildTime"),
+    (
+        "dx_successfulDeploymentsRatio",
+        "developerExperience",
+        "successfulDeploymentsRatio",
+    ),
+    ("dx_timeToFirstCommit", "developerExperience", "timeToFirstCommit"),
+    ("dx_averageCommentsPerPR", "developerExperience", "averageCommentsPerPR"),
+    ("dx_prIterationRate", "developerExperience", "prIterationRate"),
+    ("tp_buildTime", "technicalPerformance", "buildTime"),
+    ("tp_testCoverage", "technicalPerformance", "testCoverage"),
+    ("tp_typeScriptErrorRate", "technicalPerformance", "typeScriptErrorRate"),
+    ("tp_bundleSize", "technicalPerformance", "bundleSize"),
+    ("tp_bundleLoadTime", "technicalPerformance", "bundleLoadTime"),
+    ("tp_performanceScore", "technicalPerformance", "performanceScore"),
+    ("bi_featureSuccessRate", "businessImpact", "featureSuccessRate"),
+    ("bi_activeContributors", "businessImpact", "activeContributors"),
+    ("bi_issueResolutionRate", "businessImpact", "issueResolutionRate"),
+    ("bi_deploymentFrequency", "businessImpact", "deploymentFrequency"),
+    ("bi_changeFailureRate", "businessImpact", "changeFailureRate"),
+]
+RAW_FEATURES = [name for name, _, _ in RAW_METRICS]
+
+# Column order of engineer_features_columnar() output
+ENGINEERED_FEATURES = RAW_FEATURES + [
+    "avg_dx",
+    "avg_tp",
+    "avg_bi",
+    "dx_tp_interaction",
+    "tp_bi_interaction",
+    "dx_bi_interaction",
+    "dx_codeReviewDuration_squared",
+    "tp_testCoverage_squared",
+    "dx_codeReviewDuration_log",
+    "tp_bundleSize_log",
+    "tp_efficiency_ratio",
+    "dx_review_efficiency",
+]
+
+
+def raw_metrics_matrix(metrics_list):
+    """
+    Extract raw metrics of many projects into a 2-D array (RAW_FEATURES order).
+
+    Missing metrics become 0 and non-numeric values become NaN, matching
+    how engineer_features() treats them in the category averages.
+    """
+    np = lazy_import("numpy")
+
+    X = np.zeros((len(metrics_list), len(RAW_METRICS)))
+
+    for i, metrics in enumerate(metrics_list):
+        for j, (_, category, key) in enumerate(RAW_METRICS):
+            value = metrics.get(category, {}).get(key, 0)
+            X[i, j] = value if isinstance(value, (int, float)) else np.nan
+
+    return X
+
+
+def engineer_features_columnar(raw):
+    """
+    Vectorized engineer_features() over a batch of projects.
+
+    raw is a 2-D array with columns in RAW_FEATURES order, or a DataFrame
+    with RAW_FEATURES columns (absent columns are treated as 0). Returns a
+    2-D array with columns in ENGINEERED_FEATURES order, or a DataFrame if
+    a DataFrame was passed. Values match the scalar path, including NaN,
+    inf and negative inputs, except that NumPy's log1p may differ from
+    math.log1p by an ulp (checked in tests/test_predict.py).
+    """
+    np = lazy_import("numpy")
+
+    frame_index = None
+    if hasattr(raw, "reindex"):
+        frame_index = raw.index
+        raw = raw.reindex(columns=RAW_FEATURES, fill_value=0).to_numpy(dtype=float)
+
+    raw = np.asarray(raw, dtype=float)
+    n_rows = raw.shape[0]
+    col = {name: raw[:, j] for j, name in enumerate(RAW_FEATURES)}
+
+    out = np.empty((n_rows, len(ENGINEERED_FEATURES)))
+    out[:, : len(RAW_FEATURES)] = raw
+
+    # Category averages (non-numeric values are NaN and skipped)
+    averages = []
+    for prefix in ("dx_", "tp_", "bi_"):
+        block = raw[
+            :, [j for j, name in enumerate(RAW_FEATURES) if name.startswith(prefix)]
+        ]
+        valid = ~np.isnan(block)
+        counts = valid.sum(axis=1)
+        sums = np.where(valid, block, 0.0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages.append(np.where(counts > 0, sums / counts, 0.0))
+    avg_dx, avg_tp, avg_bi = averages
+
+    review = col["dx_codeReviewDuration"]
+    coverage = col["tp_testCoverage"]
+    bundle = col["tp_bundleSize"]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        derived = [
+            avg_dx,
+            avg_tp,
+            avg_bi,
+            # Interaction features
+            avg_dx * avg_tp,
+            avg_tp * avg_bi,
+            avg_dx * avg_bi,
+            # Polynomial features
+            review**2,
+            coverage**2,
+            # Log transformations
+            np.log1p(review),
+            np.log1p(bundle),
+            # Ratio features (0 when the denominator is not positive)
+            np.where(bundle > 0, coverage / bundle, 0.0),
+            np.where(review > 0, col["dx_averageCommentsPerPR"] / review, 0.0),
+        ]
+
+    for offset, values in enumerate(derived, start=len(RAW_FEATURES)):
+        out[:, offset] = values
+
+    if frame_index is not None:
+        import pandas as pd
+
+        return pd.DataFrame(out, columns=ENGINEERED_FEATURES, index=frame_index)
+    return out
+
+
+# Values for feature_list entries that engineer_features() does not produce
+# (e.g. "confidence", "Cluster"); anything not listed here defaults to 0.
+FEATURE_DEFAULTS = {}
+
+
+def resolve_feature_name(feat):
+    """
+    Name of the engineered feature that supplies a model feature.
+
+    Tries the exact name, then the name without its prefix; returns None
+    if engineer_features() does not produce it.
+    """
+    if feat in ENGINEERED_FEATURES:
+        return feat
+    base_name = feat.split("_", 1)[-1] if "_" in feat else feat
+    if base_name in ENGINEERED_FEATURES:
+        return base_name
+    return None
+
+
+def compile_feature_plan(feature_list):
+    """
+    Map every feature_list entry to a fixed ENGINEERED_FEATURES column.
+
+    Name resolution (exact name, then the name without its prefix) is done
+    once here instead of on every request. Features that cannot be
+    engineered are filled from FEATURE_DEFAULTS (0 if not declared).
+    """
+    np = lazy_import("numpy")
+
+    positions = {name: j for j, name in enumerate(ENGINEERED_FEATURES)}
+    indices = np.zeros(len(feature_list), dtype=np.intp)
+    missing_mask = np.zeros(len(feature_list), dtype=bool)
     missing_features = []
 
-    for feat in feature_list:
-        if feat in all_features:
-            feature_vector.append(all_features[feat])
+    for i, feat in enumerate(feature_list):
+        source = resolve_feature_name(feat)
+        if source:
+            indices[i] = positions[source]
         else:
-            # Try without prefix
-            base_name = feat.split("_", 1)[-1] if "_" in feat else feat
-            if base_name in all_features:
-                feature_vector.append(all_features[base_name])
-            else:
-                feature_vector.append(0)
-                missing_features.append(feat)
+            missing_mask[i] = True
+            missing_features.append(feat)
+
+    return {
+        "features": list(feature_list),
+        "indices": indices,
+        "missing_mask": missing_mask,
+        "defaults": np.array([FEATURE_DEFAULTS.get(f, 0) for f in missing_features]),
+        "missing": missing_features,
+    }
 
-    X = np.array([feature_vector])
 
-    # Make predictions
+@lru_cache(maxsize=8)
+def _cached_feature_plan(feature_tuple):
+    return compile_feature_plan(list(feature_tuple))
+
+
+def resolve_feature_plan(feature_list, plan=None):
+    """Return plan, or a (cached) plan compiled from feature_list."""
+    if plan is not None:
+        return plan
+    return _cached_feature_plan(tuple(feature_list))
+
+
+def report_missing_features(plan):
+    """Warn once (on stderr) about features filled with defaults."""
+    if plan["missing"]:
+        sys.stderr.write(
+            f"Warning: {len(plan['missing'])} model features are not engineered "
+            f"and use defaults: {', '.join(plan['missing'])}\n"
+        )
+
+
+def apply_feature_plan(engineered, plan):
+    """Gather the model feature matrix out of an ENGINEERED_FEATURES matrix."""
+    X = engineered[:, plan["indices"]]
+    if plan["missing"]:
+        X[:, plan["missing_mask"]] = plan["defaults"]
+    return X
+
+
+def predict_matrix(X, models, scalers):
+    """Run every target model once over a 2-D feature matrix."""
+    if isinstance(models, LinearKernel):
+        Y = models.predict_all(X)
+        return {target: Y[:, models.targets.index(target)] for target in TARGETS}
+
     predictions = {}
 
-    for target in ["overallScore", "timeToMarket", "communityGrowth"]:
+    for target in TARGETS:
         model = models[target]
         scaler = scalers[target]
 
         if scaler is not None:
-            X_scaled = scaler.transform(X)
-            pred = model.predict(X_scaled)[0]
+            predictions[target] = model.predict(scaler.transform(X))
         else:
-            pred = model.predict(X)[0]
+            predictions[target] = model.predict(X)
+
+    return predictions
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predictions, optionally persisted to a JSON file.
+
+    Keys are a SHA-256 of the model fingerprint (see bind) and the
+    project's raw model-input metrics in RAW_METRICS order, so unrelated
+    fields such as name or collectedAt do not split entries.
+    """
+
+    def __init__(self, max_size=10000, path=None):
+        self.max_size = max_size
+        self.path = Path(path) if path else None
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self._entries.update(json.load(f))
+            except (OSError, ValueError):
+                pass  # Corrupt or unreadable cache: start empty
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def bind(self, model_version):
+        """Key subsequent lookups by this model version/fingerprint."""
+        self.model_version = model_version
+
+    def key(self, metrics):
+        raw = []
+        for _, category, key in RAW_METRICS:
+            value = metrics.get(category, {}).get(key, 0)
+            # 50 and 50.0 give identical predictions: hash them the same
+            raw.append(float(value) if isinstance(value, (int, float)) else value)
+        canonical = json.dumps([self.model_version, raw], separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, metrics):
+        key = self.key(metrics)
+        predictions = self._entries.get(key)
+        if predictions is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(predictions)
+
+    def put(self, metrics, predictions):
+        key = self.key(metrics)
+        self._entries[key] = dict(predictions)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+        }
+
+    def save(self):
+        """Write the cache file atomically (no-op for in-memory caches)."""
+        if self.path is None:
+            return
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def predict(metrics, models, scalers, feature_list, plan=None, cache=None):
+    """
+    Make predictions using loaded models.
+
+    With a PredictionCache bound to the loaded model version, repeated
+    metrics skip feature engineering and model evaluation.
+    """
+    if cache is not None:
+        predictions = cache.get(metrics)
+        if predictions is None:
+            predictions, missing = predict(metrics, models, scalers, feature_list, plan)
+            cache.put(metrics, predictions)
+            return predictions, missing
+        if isinstance(models, LinearKernel):
+            return predictions, list(models.missing)
+        return predictions, resolve_feature_plan(feature_list, plan)["missing"]
+
+    if isinstance(models, LinearKernel):
+        # Single row: pure-Python dot products beat array setup
+        raw_predictions = models.predict_one(engineer_features(metrics))
+        predictions = {target: round(raw_predictions[target], 2) for target in TARGETS}
+        return predictions, list(models.missing)
 
-        predictions[target] = round(float(pred), 2)
+    plan = resolve_feature_plan(feature_list, plan)
 
-    return predictions, missing_features
+    # Engineer features and place them in model order
+    engineered = engineer_features_columnar(raw_metrics_matrix([metrics]))
+    X = apply_feature_plan(engineered, plan)
 
+    # Make predictions
+    raw_predictions = predict_matrix(X, models, scalers)
+    predictions = {
+        target: round(float(pred[0]), 2) for target, pred in raw_predictions.items()
+    }
+
+    return predictions, plan["missing"]
+
+
+def load_batch_input(data):
+    """
+    Normalize batch input to a list of raw metric dicts.
+
+    Accepts either a JSON array of raw metrics or a metrics_report.json-shaped
+    object with a "projects" array.
+    """
+    if isinstance(data, dict) and "projects" in data:
+        data = data["projects"]
+    if not isinstance(data, list):
+        raise ValueError("Batch input must be a JSON array or contain 'projects'")
+    return data
+
+
+def predict_batch(
+    metrics_list, models, scalers, feature_list, chunk_size=5000, plan=None
+):
+    """
+    Score many projects with one feature matrix and one predict per target.
 
-def what_if_analysis(metrics, whatif_changes, models, scalers, feature_list):
+    Yields one result dict per input entry, in input order. Input is
+    processed in chunks of chunk_size rows so results can be streamed.
+    """
+    plan = resolve_feature_plan(feature_list, plan)
+    missing = plan["missing"]
+
+    for start in range(0, len(metrics_list), chunk_size):
+        chunk = metrics_list[start : start + chunk_size]
+
+        engineered = engineer_features_columnar(raw_metrics_matrix(chunk))
+        X = apply_feature_plan(engineered, plan)
+        raw_predictions = predict_matrix(X, models, scalers)
+
+        for i, metrics in enumerate(chunk):
+            result = {
+                "type": "prediction",
+                "predictions": {
+                    target: round(float(pred[i]), 2)
+                    for target, pred in raw_predictions.items()
+                },
+            }
+            if "name" in metrics:
+                result["name"] = metrics["name"]
+
+            if missing:
+                result["warnings"] = {
+                    "missingFeatures": missing[:5],
+                    "totalMissing": len(missing),
+                }
+
+            yield result
+
+
+def what_if_analysis(
+    metrics, whatif_changes, models, scalers, feature_list, plan=None, cache=None
+):
     """
     Perform what-if analysis by comparing predictions with and without changes.
 
@@ -216,7 +910,7 @@ def what_if_analysis(metrics, whatif_changes, models, scalers, feature_list):
         {"dx_codeReviewDuration": 24, "tp_testCoverage": 90}
     """
     # Get baseline predictions
-    baseline_preds, _ = predict(metrics, models, scalers, feature_list)
+    baseline_preds, _ = predict(metrics, models, scalers, feature_list, plan, cache)
 
     # Apply what-if changes to metrics
     modified_metrics = json.loads(json.dumps(metrics))  # Deep copy
@@ -240,7 +934,9 @@ def what_if_analysis(metrics, whatif_changes, models, scalers, feature_list):
             modified_metrics["businessImpact"][metric_name] = value
 
     # Get modified predictions
-    modified_preds, _ = predict(modified_metrics, models, scalers, feature_list)
+    modified_preds, _ = predict(
+        modified_metrics, models, scalers, feature_list, plan, cache
+    )
 
     # Calculate differences
     analysis = {}
@@ -259,8 +955,651 @@ def what_if_analysis(metrics, whatif_changes, models, scalers, feature_list):
     return analysis
 
 
+# Upper bound on grid points evaluated by one what_if_sweep() call
+MAX_SWEEP_POINTS = 1_000_000
+
+
+def sweep_axis_values(spec):
+    """
+    Expand one sweep axis spec into a list of values.
+
+    spec is a list of values, {"start", "stop", "num"} (inclusive linspace)
+    or {"start", "stop", "step"} (inclusive range).
+    """
+    np = lazy_import("numpy")
+
+    invalid = ValueError(f"Invalid sweep axis: {spec}")
+    if isinstance(spec, list):
+        try:
+            return np.asarray(spec, dtype=float)
+        except (TypeError, ValueError):
+            raise invalid from None
+    if not isinstance(spec, dict) or not {"start", "stop"} <= spec.keys():
+        raise invalid
+    if "num" not in spec and "step" not in spec:
+        raise invalid
+    try:
+        start, stop = float(spec["start"]), float(spec["stop"])
+        if "num" in spec:
+            return np.linspace(start, stop, int(spec["num"]))
+        step = float(spec["step"])
+    except (TypeError, ValueError):
+        raise invalid from None
+    if step <= 0:
+        raise ValueError("Sweep step must be positive")
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(max(count, 0))
+
+
+def what_if_sweep(metrics, ranges, models, scalers, feature_list, plan=None):
+    """
+    Evaluate what-if changes over the full Cartesian grid of metric values.
+
+    ranges maps dx_/tp_/bi_ metric names to axis specs (see
+    sweep_axis_values), e.g.:
+        {"dx_codeReviewDuration": {"start": 12, "stop": 96, "num": 100},
+         "tp_testCoverage": [60, 70, 80, 90]}
+
+    The whole grid is built as one raw-metrics matrix and scored with one
+    model call per target. Predictions and deltas against the baseline are
+    returned as flat lists in C order over the axes (last axis fastest).
+    """
+    np = lazy_import("numpy")
+    plan = resolve_feature_plan(feature_list, plan)
+
+    if not isinstance(ranges, dict):
+        raise ValueError(f"Invalid sweep: {ranges}")
+    axes = {}
+    for key, spec in ranges.items():
+        if key not in RAW_FEATURES:
+            raise ValueError(f"{key} is not a model input metric")
+        axes[key] = sweep_axis_values(spec)
+
+    shape = [len(values) for values in axes.values()]
+    n_points = int(np.prod(shape)) if shape else 0
+    if n_points > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep grid too large: {n_points} > {MAX_SWEEP_POINTS}")
+
+    # Row 0 is the unchanged baseline, rows 1.. are grid points
+    base = raw_metrics_matrix([metrics])
+    raw = np.repeat(base, n_points + 1, axis=0)
+    if axes:
+        grid = np.meshgrid(*axes.values(), indexing="ij")
+        for key, values in zip(axes, grid):
+            raw[1:, RAW_FEATURES.index(key)] = values.ravel()
+
+    X = apply_feature_plan(engineer_features_columnar(raw), plan)
+    raw_predictions = predict_matrix(X, models, scalers)
+
+    baseline = {}
+    predictions = {}
+    deltas = {}
+    for target, values in raw_predictions.items():
+        baseline[target] = round(float(values[0]), 2)
+        predictions[target] = np.round(values[1:], 2).tolist()
+        deltas[target] = np.round(values[1:] - values[0], 2).tolist()
+
+    return {
+        "axes": {key: values.tolist() for key, values in axes.items()},
+        "shape": shape,
+        "baseline": baseline,
+        "predictions": predictions,
+        "deltas": deltas,
+    }
+
+
+# +1: higher is better, -1: lower is better
+TARGET_DIRECTIONS = {"overallScore": 1, "timeToMarket": -1, "communityGrowth": 1}
+
+# Feasible ranges for raw metrics in optimize_intervention(); others are >= 0
+METRIC_BOUNDS = {
+    "dx_successfulDeploymentsRatio": (0, 1),
+    "dx_prIterationRate": (0, 1),
+    "tp_testCoverage": (0, 100),
+    "tp_performanceScore": (0, 100),
+    "bi_featureSuccessRate": (0, 1),
+    "bi_issueResolutionRate": (0, 1),
+    "bi_changeFailureRate": (0, 1),
+}
+
+
+def engineered_weights(models, scalers, plan):
+    """
+    Express every target model as weights over ENGINEERED_FEATURES.
+
+    Returns (W, b) with W of shape (n_targets, n_engineered) in TARGETS
+    order; features filled with defaults only contribute to b.
+    """
+    np = lazy_import("numpy")
+
+    if isinstance(models, LinearKernel):
+        rows = {
+            target: (np.asarray(models.weights[t], dtype=float), models.bias[t])
+            for t, target in enumerate(models.targets)
+        }
+    else:
+        rows = {
+            target: fold_linear_model(models[target], scalers[target])
+            for target in TARGETS
+        }
+
+    W = np.zeros((len(TARGETS), len(ENGINEERED_FEATURES)))
+    b = np.zeros(len(TARGETS))
+    for t, target in enumerate(TARGETS):
+        weights, bias = rows[target]
+        placed = ~plan["missing_mask"]
+        np.add.at(W[t], plan["indices"][placed], weights[placed])
+        b[t] = bias + float(weights[plan["missing_mask"]] @ plan["defaults"])
+
+    return W, b
+
+
+def engineered_jacobian(raw_row):
+    """
+    Closed-form Jacobian of engineer_features_columnar() for one project.
+
+    raw_row holds raw metrics in RAW_FEATURES order; the result has shape
+    (n_engineered, n_raw) with d engineered[i] / d raw[j] at [i, j].
+    """
+    np = lazy_import("numpy")
+
+    raw = np.asarray(raw_row, dtype=float)
+    n_raw = len(RAW_FEATURES)
+    J = np.zeros((len(ENGINEERED_FEATURES), n_raw))
+    J[:n_raw, :n_raw] = np.eye(n_raw)
+    row = {name: i for i, name in enumerate(ENGINEERED_FEATURES)}
+    col = {name: j for j, name in enumerate(RAW_FEATURES)}
+
+    averages = {}
+    for prefix, avg_name in (("dx_", "avg_dx"), ("tp_", "avg_tp"), ("bi_", "avg_bi")):
+        block = [j for j, name in enumerate(RAW_FEATURES) if name.startswith(prefix)]
+        J[row[avg_name], block] = 1.0 / len(block)
+        averages[avg_name] = raw[block].mean()
+
+    for name, (left, right) in {
+        "dx_tp_interaction": ("avg_dx", "avg_tp"),
+        "tp_bi_interaction": ("avg_tp", "avg_bi"),
+        "dx_bi_interaction": ("avg_dx", "avg_bi"),
+    }.items():
+        J[row[name]] = averages[right] * J[row[left]] + averages[left] * J[row[right]]
+
+    review = raw[col["dx_codeReviewDuration"]]
+    coverage = raw[col["tp_testCoverage"]]
+    bundle = raw[col["tp_bundleSize"]]
+    comments = raw[col["dx_averageCommentsPerPR"]]
+
+    J[row["dx_codeReviewDuration_squared"], col["dx_codeReviewDuration"]] = 2 * review
+    J[row["tp_testCoverage_squared"], col["tp_testCoverage"]] = 2 * coverage
+    J[row["dx_codeReviewDuration_log"], col["dx_codeReviewDuration"]] = 1 / (1 + review)
+    J[row["tp_bundleSize_log"], col["tp_bundleSize"]] = 1 / (1 + bundle)
+
+    # Guarded ratios are constant 0 when the denominator is not positive
+    if bundle > 0:
+        J[row["tp_efficiency_ratio"], col["tp_testCoverage"]] = 1 / bundle
+        J[row["tp_efficiency_ratio"], col["tp_bundleSize"]] = -coverage / bundle**2
+    if review > 0:
+        J[row["dx_review_efficiency"], col["dx_averageCommentsPerPR"]] = 1 / review
+        J[row["dx_review_efficiency"], col["dx_codeReviewDuration"]] = (
+            -comments / review**2
+        )
+
+    return J
+
+
+def sensitivity_analysis(metrics, models, scalers, feature_list, plan=None):
+    """
+    Partial derivatives and elasticities of every target w.r.t. raw metrics.
+
+    The models are linear in the engineered features, so the gradient is
+    the model weights times the closed-form feature Jacobian. Elasticity
+    is gradient * metric / prediction (None when either is zero).
+    """
+    plan = resolve_feature_plan(feature_list, plan)
+
+    raw = raw_metrics_matrix([metrics])
+    W, b = engineered_weights(models, scalers, plan)
+    values = W @ engineer_features_columnar(raw)[0] + b
+    gradients = W @ engineered_jacobian(raw[0])
+
+    predictions = {}
+    sensitivity = {}
+    for t, target in enumerate(TARGETS):
+        predictions[target] = round(float(values[t]), 2)
+        sensitivity[target] = {}
+        for j, metric in enumerate(RAW_FEATURES):
+            gradient = float(gradients[t, j])
+            elasticity = None
+            if values[t] != 0 and raw[0, j] != 0:
+                elasticity = round(gradient * raw[0, j] / values[t], 4)
+            sensitivity[target][metric] = {
+                "gradient": gradient,
+                "elasticity": elasticity,
+            }
+
+    return predictions, sensitivity
+
+
+def optimize_intervention(
+    metrics,
+    target,
+    budget,
+    models,
+    scalers,
+    feature_list,
+    plan=None,
+    allowed_metrics=None,
+    bounds=None,
+    steps=200,
+):
+    """
+    Search the change set that improves target most under a change budget.
+
+    The budget caps the total relative change sum(|new - old| / |old|) over
+    the changed metrics (metrics that are 0 are measured in absolute
+    units). The budget is spent in small increments, each on the metric
+    with the best analytic gain per unit of cost, within METRIC_BOUNDS (or
+    bounds overrides) and limited to allowed_metrics if given.
+    """
+    np = lazy_import("numpy")
+    plan = resolve_feature_plan(feature_list, plan)
+
+    if target not in TARGET_DIRECTIONS:
+        raise ValueError(f"Unknown target: {target}")
+    if budget <= 0:
+        raise ValueError("Budget must be positive")
+
+    allowed = list(allowed_metrics) if allowed_metrics else list(RAW_FEATURES)
+    for metric in allowed:
+        if metric not in RAW_FEATURES:
+            raise ValueError(f"{metric} is not a model input metric")
+    allowed_idx = np.array([RAW_FEATURES.index(m) for m in allowed])
+
+    metric_bounds = {**METRIC_BOUNDS, **(bounds or {})}
+    lower = np.array([metric_bounds.get(m, (0, None))[0] for m in RAW_FEATURES])
+    upper = np.array(
+        [
+            (
+                np.inf
+                if metric_bounds.get(m, (0, None))[1] is None
+                else metric_bounds[m][1]
+            )
+            for m in RAW_FEATURES
+        ],
+        dtype=float,
+    )
+
+    W, _ = engineered_weights(models, scalers, plan)
+    t = TARGETS.index(target)
+    direction = TARGET_DIRECTIONS[target]
+
+    original = raw_metrics_matrix([metrics])[0]
+    scale = np.where(original != 0, np.abs(original), 1.0)
+    current = original.copy()
+    step_cost = budget / steps
+    spent = 0.0
+
+    for _ in range(steps):
+        gradient = direction * (W[t] @ engineered_jacobian(current))
+        # Gain per unit of relative cost when moving uphill
+        gain = np.abs(gradient) * scale
+        movable = np.where(gradient > 0, current < upper, current > lower)
+        candidates = [j for j in allowed_idx if movable[j] and gain[j] > 0]
+        if not candidates:
+            break
+
+        j = max(candidates, key=lambda k: gain[k])
+        delta = np.sign(gradient[j]) * step_cost * scale[j]
+        new_value = float(np.clip(current[j] + delta, lower[j], upper[j]))
+        spent += abs(new_value - current[j]) / scale[j]
+        current[j] = new_value
+
+    changes = {
+        RAW_FEATURES[j]: round(float(current[j]), 4)
+        for j in range(len(RAW_FEATURES))
+        if current[j] != original[j]
+    }
+    return changes, round(spent, 4)
+
+
+def handle_request(input_data, models, scalers, feature_list, plan=None, cache=None):
+    """Build the JSON response for a prediction or what-if style request."""
+    if "sensitivity" in input_data:
+        predictions, sensitivity = sensitivity_analysis(
+            input_data.get("metrics", {}), models, scalers, feature_list, plan
+        )
+        return {
+            "type": "sensitivity",
+            "predictions": predictions,
+            "sensitivity": sensitivity,
+        }
+
+    if "optimize" in input_data:
+        metrics = input_data.get("metrics", {})
+        options = input_data["optimize"]
+        target = options.get("target", "overallScore")
+        changes, spent = optimize_intervention(
+            metrics,
+            target,
+            float(options.get("budget", 0.1)),
+            models,
+            scalers,
+            feature_list,
+            plan,
+            allowed_metrics=options.get("metrics"),
+            bounds={k: tuple(v) for k, v in options.get("bounds", {}).items()},
+        )
+        return {
+            "type": "optimize",
+            "target": target,
+            "budget": float(options.get("budget", 0.1)),
+            "budgetUsed": spent,
+            "changes": changes,
+            "analysis": what_if_analysis(
+                metrics, changes, models, scalers, feature_list, plan, cache
+            ),
+        }
+
+    if "sweep" in input_data:
+        sweep = what_if_sweep(
+            input_data.get("metrics", {}),
+            input_data["sweep"],
+            models,
+            scalers,
+            feature_list,
+            plan,
+        )
+        return {"type": "sweep", **sweep}
+
+    # Check if this is a what-if analysis request
+    if "whatif" in input_data:
+        metrics = input_data.get("metrics", {})
+        whatif_changes = input_data.get("whatif", {})
+
+        analysis = what_if_analysis(
+            metrics, whatif_changes, models, scalers, feature_list, plan, cache
+        )
+
+        return {
+            "type": "whatif",
+            "changes": whatif_changes,
+            "analysis": analysis,
+        }
+
+    # Regular prediction
+    predictions, missing = predict(
+        input_data, models, scalers, feature_list, plan, cache
+    )
+
+    result = {
+        "type": "prediction",
+        "predictions": predictions,
+    }
+
+    if missing:
+        result["warnings"] = {
+            "missingFeatures": missing[:5],  # Show first 5
+            "totalMissing": len(missing),
+        }
+
+    return result
+
+
+class ModelStore:
+    """
+    Keeps loaded models in memory for the long-running server mode.
+
+    Models are reloaded lazily when the ACTIVE registry pointer moves to a
+    new version (or, for the flat layout, when metadata.json changes). A
+    pinned version is loaded once and never swapped. The prediction cache is
+    re-bound to each loaded version, so entries never leak across models.
+    """
+
+    def __init__(self, version=None, cache=None):
+        self.pinned_version = version
+        self.cache = cache
+        self.models = None
+        self.scalers = None
+        self.feature_list = None
+        self.feature_plan = None
+        self.metadata = None
+        self._state = None
+
+    def _current_state(self):
+        if self.pinned_version is not None:
+            return ("version", self.pinned_version)
+        version = active_version()
+        if version is not None:
+            return ("version", version)
+        try:
+            return ("flat", os.stat(MODELS_DIR / "metadata.json").st_mtime_ns)
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Reload models if the active version changed. Returns error or None."""
+        state = self._current_state()
+        if self.models is not None and state == self._state:
+            return None
+
+        version = state[1] if state and state[0] == "version" else None
+        models, scalers, feature_list, metadata = load_models(version=version)
+        if models is None:
+            return metadata  # Contains error message
+
+        self.models = models
+        self.scalers = scalers
+        self.feature_list = feature_list
+        self.feature_plan = compile_feature_plan(feature_list)
+        self.metadata = metadata
+        self._state = state
+        if self.cache is not None:
+            self.cache.bind(metadata["fingerprint"])
+        report_missing_features(self.feature_plan)
+        return None
+
+
+def serve(stream_in=sys.stdin, stream_out=sys.stdout, version=None, cache=None):
+    """
+    Serve prediction requests as JSON lines until EOF.
+
+    Each input line is a JSON object with optional "id" and "type"
+    ("predict" | "whatif" | "sweep" | "sensitivity" | "optimize" | "batch" |
+    "ping"). Prediction requests carry raw metrics either under "metrics"
+    or at the top level, as in the CLI mode. Each response is written as one
+    JSON line with the same "id". Predictions go through an in-memory
+    PredictionCache unless one is passed in; it is saved on EOF.
+    """
+    if cache is None:
+        cache = PredictionCache()
+    store = ModelStore(version, cache)
+    error = store.refresh()
+    if error is not None:
+        stream_out.write(json.dumps(error) + "\n")
+        stream_out.flush()
+
+    for line in stream_in:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {"error": f"Invalid JSON: {str(e)}"}
+        else:
+            request_id = request.pop("id", None) if isinstance(request, dict) else None
+            response = _serve_one(store, request)
+            if request_id is not None:
+                response["id"] = request_id
+
+        stream_out.write(json.dumps(response) + "\n")
+        stream_out.flush()
+
+    cache.save()
+
+
+def _serve_one(store, request):
+    if not isinstance(request, dict):
+        return {"error": "Request must be a JSON object"}
+
+    request_type = request.pop("type", None)
+    if request_type == "ping":
+        return {
+            "type": "pong",
+            "version": (store.metadata or {}).get("version"),
+            "cache": store.cache.stats(),
+        }
+
+    error = store.refresh()
+    if error is not None:
+        return error
+
+    if request_type == "batch":
+        started = time.perf_counter()
+        try:
+            results = list(
+                predict_batch(
+                    load_batch_input(request.get("projects", [])),
+                    store.models,
+                    store.scalers,
+                    store.feature_list,
+                    plan=store.feature_plan,
+                )
+            )
+        except Exception as e:
+            return {"error": f"Batch prediction failed: {str(e)}"}
+        return {
+            "type": "batch",
+            "results": results,
+            "modelTimeMs": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    if request_type == "whatif":
+        input_data = {
+            "metrics": request.get("metrics", {}),
+            "whatif": request.get("whatif", {}),
+        }
+    elif request_type == "sweep":
+        input_data = {
+            "metrics": request.get("metrics", {}),
+            "sweep": request.get("sweep", {}),
+        }
+    elif request_type == "sensitivity":
+        input_data = {"metrics": request.get("metrics", {}), "sensitivity": True}
+    elif request_type == "optimize":
+        input_data = {
+            "metrics": request.get("metrics", {}),
+            "optimize": request.get("optimize", {}),
+        }
+    elif request_type in (None, "predict"):
+        input_data = request.get("metrics", request)
+    else:
+        return {"error": f"Unknown request type: {request_type}"}
+
+    started = time.perf_counter()
+    try:
+        result = handle_request(
+            input_data,
+            store.models,
+            store.scalers,
+            store.feature_list,
+            store.feature_plan,
+            store.cache,
+        )
+    except Exception as e:
+        return {"error": f"Prediction failed: {str(e)}"}
+    result["modelTimeMs"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def run_batch(path, version=None):
+    """Score a batch file ("-" for stdin) and stream JSON lines to stdout."""
+    try:
+        if path == "-":
+            data = json.load(sys.stdin)
+        else:
+            with open(path, "r") as f:
+                data = json.load(f)
+        metrics_list = load_batch_input(data)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"Invalid batch input: {str(e)}"}))
+        sys.exit(1)
+
+    models, scalers, feature_list, metadata = load_models(version=version)
+
+    if models is None:
+        print(json.dumps(metadata))  # Contains error message
+        sys.exit(1)
+
+    plan = compile_feature_plan(feature_list)
+    report_missing_features(plan)
+
+    for result in predict_batch(metrics_list, models, scalers, feature_list, plan=plan):
+        sys.stdout.write(json.dumps(result) + "\n")
+    sys.stdout.flush()
+
+
 def main():
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    report_timings = "--timings" in args
+    if report_timings:
+        args.remove("--timings")
+
+    # Pin a model registry version instead of following ACTIVE
+    model_version = None
+    if "--model-version" in args:
+        i = args.index("--model-version")
+        if i + 1 >= len(args):
+            print(json.dumps({"error": "--model-version requires a version id"}))
+            sys.exit(1)
+        model_version = args[i + 1]
+        del args[i : i + 2]
+
+    # Prediction cache bound (--cache-size, in-memory by itself) and
+    # persisted between runs (--cache-file)
+    cache_size = None
+    if "--cache-size" in args:
+        i = args.index("--cache-size")
+        try:
+            cache_size = int(args[i + 1])
+        except (IndexError, ValueError):
+            cache_size = 0
+        if cache_size <= 0:
+            print(json.dumps({"error": "--cache-size requires a positive integer"}))
+            sys.exit(1)
+        del args[i : i + 2]
+
+    cache_file = None
+    if "--cache-file" in args:
+        i = args.index("--cache-file")
+        if i + 1 >= len(args):
+            print(json.dumps({"error": "--cache-file requires a path"}))
+            sys.exit(1)
+        cache_file = args[i + 1]
+        del args[i : i + 2]
+
+    cache = None
+    if cache_size is not None or cache_file is not None:
+        cache = PredictionCache(cache_size or 10000, cache_file)
+
+    if args and args[0] == "--serve":
+        serve(version=model_version, cache=cache)
+        return
+
+    if args and args[0] == "--export-kernel":
+        try:
+            kernel_path = export_linear_kernel(version=model_version)
+        except Exception as e:
+            print(json.dumps({"error": f"Failed to export kernel: {str(e)}"}))
+            sys.exit(1)
+        print(json.dumps({"type": "export", "kernel": str(kernel_path)}))
+        return
+
+    if args and args[0] == "--batch":
+        run_batch(args[1] if len(args) > 1 else "-", version=model_version)
+        return
+
+    if not args:
         print(
             json.dumps(
                 {
@@ -273,46 +1612,42 @@ def main():
 
     # Parse input
     try:
-        input_data = json.loads(sys.argv[1])
+        input_data = json.loads(args[0])
     except json.JSONDecodeError as e:
         print(json.dumps({"error": f"Invalid JSON: {str(e)}"}))
         sys.exit(1)
 
     # Load models
-    models, scalers, feature_list, metadata = load_models()
+    load_started = time.perf_counter()
+    models, scalers, feature_list, metadata = load_models(version=model_version)
+    load_finished = time.perf_counter()
 
     if models is None:
         print(json.dumps(metadata))  # Contains error message
         sys.exit(1)
 
-    # Check if this is a what-if analysis request
-    if "whatif" in input_data:
-        metrics = input_data.get("metrics", {})
-        whatif_changes = input_data.get("whatif", {})
-
-        analysis = what_if_analysis(
-            metrics, whatif_changes, models, scalers, feature_list
-        )
-
-        result = {
-            "type": "whatif",
-            "changes": whatif_changes,
-            "analysis": analysis,
-        }
-    else:
-        # Regular prediction
-        predictions, missing = predict(input_data, models, scalers, feature_list)
+    try:
+        if cache is not None:
+            cache.bind(metadata["fingerprint"])
+        result = handle_request(input_data, models, scalers, feature_list, cache=cache)
+        if cache is not None:
+            cache.save()
+    except ValueError as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
 
-        result = {
-            "type": "prediction",
-            "predictions": predictions,
+    if report_timings:
+        result["timings"] = {
+            "modelFormat": (
+                "linear_kernel" if isinstance(models, LinearKernel) else "sklearn"
+            ),
+            "lazyImportsMs": dict(IMPORT_TIMINGS),
+            "startupMs": round((load_started - MODULE_LOADED) * 1000, 3),
+            "loadMs": round((load_finished - load_started) * 1000, 3),
+            "predictMs": round((time.perf_counter() - load_finished) * 1000, 3),
         }
-
-        if missing:
-            result["warnings"] = {
-                "missingFeatures": missing[:5],  # Show first 5
-                "totalMissing": len(missing),
-            }
+        if cache is not None:
+            result["timings"]["cache"] = cache.stats()
 
     print(json.dumps(result, indent=2))
 
@@ -23,11 +23,22 @@ from sklearn.decomposition import PCA
 from sklearn.cluster import KMeans
 from sklearn.metrics import silhouette_score
 import statsmodels.api as sm
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-from statsmodels.stats.multitest import multipletests
-import itertools
 import json
 
+from feature_block import FeatureBlock
+from matrix_stats import (
+    benjamini_hochberg,
+    pairwise_tests,
+    partial_correlation_matrix,
+    variance_inflation_factors,
+)
+from resampling import (
+    MEDIATION_PATHS,
+    bootstrap,
+    mediation_paths,
+    r2_increment_statistic,
+)
+
 warnings.filterwarnings("ignore")
 
 # Налаштування візуалізації
@@ -78,68 +89,50 @@ def perform_hypothesis_testing(df, metrics_list, alpha=0.05):
     """
     Виконує hypothesis testing для кореляцій між метриками.
 
+    Кореляційна матриця обчислюється один раз; t-статистики, p-values та
+    Fisher-z довірчі інтервали всіх пар (верхній трикутник) - векторно.
+
     Returns:
         DataFrame з результатами: correlation, p-value, significant, CI_lower, CI_upper
     """
-    results = []
-
-    n = len(df)
-
-    for metric1, metric2 in itertools.combinations(metrics_list, 2):
-        # Pearson correlation
-        r, p_value = stats.pearsonr(df[metric1], df[metric2])
-
-        # Fisher's Z transformation для confidence interval
-        z = np.arctanh(r)
-        se = 1 / np.sqrt(n - 3)
-        ci_lower_z = z - 1.96 * se
-        ci_upper_z = z + 1.96 * se
-        ci_lower = np.tanh(ci_lower_z)
-        ci_upper = np.tanh(ci_upper_z)
-
-        # Статистична значущість
-        significant = p_value < alpha
-
-        results.append(
-            {
-                "Метрика 1": metric1,
-                "Метрика 2": metric2,
-                "Кореляція": r,
-                "p-value": p_value,
-                "Значуща (α=0.05)": significant,
-                "CI_lower (95%)": ci_lower,
-                "CI_upper (95%)": ci_upper,
-                "Сила зв'язку": get_correlation_strength(abs(r)),
-            }
-        )
+    tests = pairwise_tests(df[metrics_list], names=metrics_list)
 
-    results_df = pd.DataFrame(results)
+    results_df = pd.DataFrame(
+        {
+            "Метрика 1": tests["name_i"],
+            "Метрика 2": tests["name_j"],
+            "Кореляція": tests["r"],
+            "t-statistic": tests["t"],
+            "p-value": tests["p"],
+            # Статистична значущість
+            "Значуща (α=0.05)": tests["p"] < alpha,
+            "CI_lower (95%)": tests["ci_lower"],
+            "CI_upper (95%)": tests["ci_upper"],
+            "Сила зв'язку": correlation_strength(tests["r"]),
+        }
+    )
     results_df = results_df.sort_values("Кореляція", key=abs, ascending=False)
 
     return results_df
 
 
-def get_correlation_strength(r):
-    """Визначає силу кореляції за Cohen's guidelines"""
-    r = abs(r)
-    if r < 0.1:
-        return "Дуже слабка"
-    elif r < 0.3:
-        return "Слабка"
-    elif r < 0.5:
-        return "Середня"
-    elif r < 0.7:
-        return "Сильна"
-    else:
-        return "Дуже сильна"
+def correlation_strength(r):
+    """Визначає силу кореляцій (масив) за Cohen's guidelines"""
+    r = np.abs(np.asarray(r, dtype=float))
+    return np.select(
+        [r < 0.1, r < 0.3, r < 0.5, r < 0.7],
+        ["Дуже слабка", "Слабка", "Середня", "Сильна"],
+        default="Дуже сильна",
+    )
 
 
 # Виконати hypothesis testing
 hypothesis_results = perform_hypothesis_testing(df, numeric_cols)
 
-# Benjamini-Hochberg FDR correction для multiple testing
-reject, pvals_corrected, _, _ = multipletests(
-    hypothesis_results["p-value"], alpha=0.05, method="fdr_bh"
+# Benjamini-Hochberg FDR correction для multiple testing (пари з
+# константною метрикою мають NaN p-value і не входять у family)
+reject, pvals_corrected = benjamini_hochberg(
+    hypothesis_results["p-value"].to_numpy(), alpha=0.05
 )
 hypothesis_results["FDR corrected p-value"] = pvals_corrected
 hypothesis_results["Значуща (FDR)"] = reject
@@ -190,12 +183,10 @@ def perform_regression_analysis(df, target, predictors, analysis_name):
     model = sm.OLS(y, X_with_const)
     results = model.fit()
 
-    # VIF для multicollinearity
+    # VIF для multicollinearity (усі VIF з оберненої кореляційної матриці)
     vif_data = pd.DataFrame()
     vif_data["Метрика"] = X.columns
-    vif_data["VIF"] = [
-        variance_inflation_factor(X.values, i) for i in range(X.shape[1])
-    ]
+    vif_data["VIF"] = variance_inflation_factors(X)
 
     # Збережемо результати
     summary_dict = {
@@ -590,75 +581,93 @@ print("SECTION 5: FEATURE ENGINEERING")
 print("=" * 80)
 print()
 
-df_engineered = df.copy()
+# Output schema of all numeric engineered features is fixed up front: one
+# preallocated block is filled in place instead of inserting DataFrame
+# columns one by one
+interaction_names = [
+    "dx_tp_interaction",
+    "tp_bi_interaction",
+    "dx_bi_interaction",
+    "testCov_x_codeReview",
+    "bundleSize_x_buildTime",
+]
+key_metrics_poly = [
+    "avg_dx",
+    "avg_tp",
+    "avg_bi",
+    "tp_testCoverage",
+    "dx_codeReviewDuration",
+]
+# NOTE: Excluded bi_communityGrowth - це target variable (data leakage!)
+skewed_metrics = [
+    "tp_bundleSize",
+    "tp_bundleLoadTime",
+    "dx_codeReviewDuration",
+]
+ratio_names = ["testCov_per_errorRate", "performance_efficiency", "dx_efficiency"]
+df_engineered = FeatureBlock(
+    interaction_names
+    + [f"{metric}_squared" for metric in key_metrics_poly]
+    + [f"{metric}_log" for metric in skewed_metrics]
+    + ratio_names,
+    index=df.index,
+)
 
 # 1. Interaction features
 print("1. Створення interaction features...")
-df_engineered["dx_tp_interaction"] = df_engineered["avg_dx"] * df_engineered["avg_tp"]
-df_engineered["tp_bi_interaction"] = df_engineered["avg_tp"] * df_engineered["avg_bi"]
-df_engineered["dx_bi_interaction"] = df_engineered["avg_dx"] * df_engineered["avg_bi"]
+df_engineered["dx_tp_interaction"] = df["avg_dx"] * df["avg_tp"]
+df_engineered["tp_bi_interaction"] = df["avg_tp"] * df["avg_bi"]
+df_engineered["dx_bi_interaction"] = df["avg_dx"] * df["avg_bi"]
 
 # Specific interactions
 df_engineered["testCov_x_codeReview"] = (
-    df_engineered["tp_testCoverage"] * df_engineered["dx_codeReviewDuration"]
-)
-df_engineered["bundleSize_x_buildTime"] = (
-    df_engineered["tp_bundleSize"] * df_engineered["tp_buildTime"]
+    df["tp_testCoverage"] * df["dx_codeReviewDuration"]
 )
+df_engineered["bundleSize_x_buildTime"] = df["tp_bundleSize"] * df["tp_buildTime"]
 print("  ✓ Створено 5 interaction features")
 
 # 2. Polynomial features (degree 2) для ключових метрик
 print("2. Створення polynomial features...")
-key_metrics_poly = [
-    "avg_dx",
-    "avg_tp",
-    "avg_bi",
-    "tp_testCoverage",
-    "dx_codeReviewDuration",
-]
 for metric in key_metrics_poly:
-    df_engineered[f"{metric}_squared"] = df_engineered[metric] ** 2
+    df_engineered[f"{metric}_squared"] = df[metric] ** 2
 print(f"  ✓ Створено {len(key_metrics_poly)} polynomial (^2) features")
 
 # 3. Log transformations для highly skewed metrics
 print("3. Log transformations для skewed metrics...")
-# NOTE: Excluded bi_communityGrowth - це target variable (data leakage!)
-skewed_metrics = [
-    "tp_bundleSize",
-    "tp_bundleLoadTime",
-    "dx_codeReviewDuration",
-]
 for metric in skewed_metrics:
     # log(x + 1) щоб уникнути log(0)
-    df_engineered[f"{metric}_log"] = np.log1p(df_engineered[metric])
+    df_engineered[f"{metric}_log"] = np.log1p(df[metric])
 print(f"  ✓ Створено {len(skewed_metrics)} log-transformed features")
 
 # 4. Ratios та composite metrics
 print("4. Створення ratio та composite features...")
-df_engineered["testCov_per_errorRate"] = df_engineered["tp_testCoverage"] / (
-    df_engineered["tp_typeScriptErrorRate"] + 0.01
-)
-df_engineered["performance_efficiency"] = df_engineered["tp_performanceScore"] / (
-    df_engineered["tp_buildTime"] + 1
+df_engineered["testCov_per_errorRate"] = df["tp_testCoverage"] / (
+    df["tp_typeScriptErrorRate"] + 0.01
 )
-df_engineered["dx_efficiency"] = df_engineered["avg_dx"] / (
-    df_engineered["dx_debuggingTime"] + 1
+df_engineered["performance_efficiency"] = df["tp_performanceScore"] / (
+    df["tp_buildTime"] + 1
 )
+df_engineered["dx_efficiency"] = df["avg_dx"] / (df["dx_debuggingTime"] + 1)
 # NOTE: Removed bi_effectiveness - містило обидва targets (data leakage!)
 # було: df_engineered["bi_effectiveness"] = df_engineered["bi_communityGrowth"] / (df_engineered["bi_timeToMarket"] + 0.1)
 print("  ✓ Створено 3 ratio features")
 
 # 5. Binning для категоризації
 print("5. Binning continuous metrics...")
-df_engineered["overallScore_category"] = pd.cut(
-    df_engineered["overallScore"],
-    bins=[0, 60, 70, 80, 100],
-    labels=["Low", "Medium", "High", "Very High"],
-)
-df_engineered["testCoverage_category"] = pd.cut(
-    df_engineered["tp_testCoverage"],
-    bins=[0, 70, 85, 95, 100],
-    labels=["Low", "Medium", "High", "Excellent"],
+df_categories = pd.DataFrame(
+    {
+        "overallScore_category": pd.cut(
+            df["overallScore"],
+            bins=[0, 60, 70, 80, 100],
+            labels=["Low", "Medium", "High", "Very High"],
+        ),
+        "testCoverage_category": pd.cut(
+            df["tp_testCoverage"],
+            bins=[0, 70, 85, 95, 100],
+            labels=["Low", "Medium", "High", "Excellent"],
+        ),
+    },
+    index=df.index,
 )
 print("  ✓ Створено 2 categorical features")
 
@@ -666,36 +675,36 @@ print("  ✓ Створено 2 categorical features")
 print("6. Feature scaling...")
 # NOTE: Excluded target variables to prevent data leakage
 TARGET_VARS = ["overallScore", "bi_timeToMarket", "bi_communityGrowth"]
-numeric_features = [
+base_features = [
     col
-    for col in df_engineered.columns
-    if df_engineered[col].dtype in ["float64", "int64"]
-]
-numeric_features = [
-    col for col in numeric_features if col not in ["Cluster"] + TARGET_VARS
+    for col in df.columns
+    if df[col].dtype in ["float64", "int64"] and col not in ["Cluster"] + TARGET_VARS
 ]
+numeric_features = base_features + df_engineered.columns
+# Column-major, as the DataFrame columns the scalers used to receive
+X_features = np.asfortranarray(
+    np.hstack([df[base_features].to_numpy(dtype=float), df_engineered.values])
+)
+
+# Both scaled copies share one block: StandardScaler (mean=0, std=1),
+# then MinMaxScaler (0-1)
+std_names = [f"{col}_std" for col in numeric_features]
+norm_names = [f"{col}_norm" for col in numeric_features]
+df_scaled = FeatureBlock(std_names + norm_names, index=df.index)
 
-# StandardScaler (mean=0, std=1)
 scaler_standard = StandardScaler()
-df_standardized = pd.DataFrame(
-    scaler_standard.fit_transform(df_engineered[numeric_features]),
-    columns=[f"{col}_std" for col in numeric_features],
-    index=df_engineered.index,
-)
+df_scaled.region(std_names)[:] = scaler_standard.fit_transform(X_features)
 
-# MinMaxScaler (0-1)
 scaler_minmax = MinMaxScaler()
-df_normalized = pd.DataFrame(
-    scaler_minmax.fit_transform(df_engineered[numeric_features]),
-    columns=[f"{col}_norm" for col in numeric_features],
-    index=df_engineered.index,
-)
+df_scaled.region(norm_names)[:] = scaler_minmax.fit_transform(X_features)
 
 print(f"  ✓ StandardScaler: {len(numeric_features)} features")
 print(f"  ✓ MinMaxScaler: {len(numeric_features)} features")
 
-# Combine original + engineered + scaled
-df_full_engineered = pd.concat([df_engineered, df_standardized, df_normalized], axis=1)
+# Combine original + engineered + scaled (each block wrapped once)
+df_full_engineered = pd.concat(
+    [df, df_engineered.to_frame(), df_categories, df_scaled.to_frame()], axis=1
+)
 
 print()
 print("✓ Feature engineering завершено!")
@@ -753,6 +762,10 @@ print("SECTION 6: ADVANCED STATISTICAL ANALYSIS")
 print("=" * 80)
 print()
 
+# Bootstrap CI: кількість вибірок та процесів (0 = усі ядра)
+BOOTSTRAP_RESAMPLES = 5000
+BOOTSTRAP_WORKERS = 0
+
 # 1. Mediation Analysis: DX -> TP -> BI
 print("1. Mediation Analysis: DX → TP → BI")
 print(
@@ -796,6 +809,35 @@ print(f"     - Indirect effect (a × b): {indirect_effect:.4f}")
 print(f"     - Direct effect (c'): {direct_effect:.4f}")
 print(f"     - Total effect (c): {total_effect:.4f}")
 print(f"     - Proportion mediated: {proportion_mediated:.2%}")
+
+# Bootstrap довірчі інтервали шляхів медіації (пакетний OLS на всіх вибірках)
+mediation_boot = bootstrap(
+    mediation_paths,
+    df[["avg_dx", "avg_tp", "avg_bi"]],
+    n_resamples=BOOTSTRAP_RESAMPLES,
+    method="bca",
+    seed=42,
+    workers=BOOTSTRAP_WORKERS,
+)
+mediation_labels = {
+    "a": "Path a (DX→TP)",
+    "b": "Path b (TP→BI)",
+    "c": "Total Effect (c)",
+    "c_prime": "Direct Effect (c')",
+    "indirect": "Indirect Effect (a×b)",
+}
+mediation_ci = {}
+print(f"\n   Bootstrap 95% CI (BCa, {BOOTSTRAP_RESAMPLES} resamples):")
+for j, path in enumerate(MEDIATION_PATHS):
+    ci = [float(mediation_boot["ci_lower"][j]), float(mediation_boot["ci_upper"][j])]
+    mediation_ci[mediation_labels[path]] = ci
+    print(f"     - {mediation_labels[path]:22} [{ci[0]:.4g}, {ci[1]:.4g}]")
+indirect_ci = mediation_ci["Indirect Effect (a×b)"]
+indirect_significant = not (indirect_ci[0] <= 0 <= indirect_ci[1])
+if indirect_significant:
+    print("     ✓ Indirect effect значущий (CI не містить 0)")
+else:
+    print("     - Indirect effect незначущий (CI містить 0)")
 print()
 
 # 2. Partial correlations (controlling for confounders)
@@ -806,19 +848,12 @@ print()
 def partial_correlation(df, x, y, control_vars):
     """
     Обчислює partial correlation між x та y, контролюючи control_vars.
-    """
-    # Residualize x
-    X_control = sm.add_constant(df[control_vars])
-    model_x = sm.OLS(df[x], X_control).fit()
-    resid_x = model_x.resid
-
-    # Residualize y
-    model_y = sm.OLS(df[y], X_control).fit()
-    resid_y = model_y.resid
 
-    # Correlation of residuals
-    r, p = stats.pearsonr(resid_x, resid_y)
-    return r, p
+    Для багатьох пар одразу: partial_correlation_matrix() (одна проекція
+    controls для всіх змінних).
+    """
+    result = partial_correlation_matrix(df[[x, y]], controls=df[control_vars])
+    return result["r"][0, 1], result["p"][0, 1]
 
 
 # Приклад: correlation між testCoverage та communityGrowth, контролюючи codeReviewDuration
@@ -863,6 +898,22 @@ print("\n   Incremental R² contributions:")
 print(f"     - DX alone: {r2_values[0]['R²']:.4f}")
 print(f"     - TP added: {r2_values[1]['R²'] - r2_values[0]['R²']:.4f}")
 print(f"     - BI added: {r2_values[2]['R²'] - r2_values[1]['R²']:.4f}")
+
+# Bootstrap CI для R² increments (ті самі nested models на кожній вибірці)
+r2_boot = bootstrap(
+    r2_increment_statistic([len(vars_list) for _, vars_list in models_seq]),
+    df[["overallScore", "avg_dx", "avg_tp", "avg_bi"]],
+    n_resamples=BOOTSTRAP_RESAMPLES,
+    method="bca",
+    seed=42,
+    workers=BOOTSTRAP_WORKERS,
+)
+r2_ci = {}
+print(f"\n   Bootstrap 95% CI (BCa, {BOOTSTRAP_RESAMPLES} resamples):")
+for j, label in enumerate(["DX alone", "TP added", "BI added"]):
+    ci = [float(r2_boot["ci_lower"][j]), float(r2_boot["ci_upper"][j])]
+    r2_ci[label] = ci
+    print(f"     - {label:10} [{ci[0]:.4f}, {ci[1]:.4f}]")
 print()
 
 # Зберегти mediation та advanced results
@@ -874,6 +925,8 @@ advanced_results = {
         "Proportion Mediated": proportion_mediated,
         "Path a (DX→TP)": beta_a,
         "Path b (TP→BI)": beta_b,
+        "Bootstrap 95% CI (BCa)": mediation_ci,
+        "Indirect Effect Significant (bootstrap)": indirect_significant,
     },
     "Partial Correlation Example": {
         "Variables": "testCoverage ↔ communityGrowth | codeReviewDuration",
@@ -887,6 +940,11 @@ advanced_results = {
         "R² (DX + TP + BI)": r2_values[2]["R²"],
         "Incremental R² (TP)": r2_values[1]["R²"] - r2_values[0]["R²"],
         "Incremental R² (BI)": r2_values[2]["R²"] - r2_values[1]["R²"],
+        "Bootstrap 95% CI (BCa)": {
+            "R² (DX only)": r2_ci["DX alone"],
+            "Incremental R² (TP)": r2_ci["TP added"],
+            "Incremental R² (BI)": r2_ci["BI added"],
+        },
     },
 }
 
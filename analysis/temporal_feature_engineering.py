@@ -7,28 +7,184 @@ Temporal Feature Engineering
 Автор: Слабенко Костянтин Олегович
 Група: АС-202
 Одеський політехнічний національний університет
+
+Використання:
+    python temporal_feature_engineering.py
+
+    # Дописати features лише для нових місячних snapshots
+    # (результат ідентичний повному перерахунку):
+    python temporal_feature_engineering.py --incremental
+
+    # Паралельно по шардах проектів (0 - усі ядра):
+    python temporal_feature_engineering.py --workers 8
+
+    # Lags, momentum і вікна в календарних місяцях (пропущені місяці -
+    # NaN, а не сусідній snapshot):
+    python temporal_feature_engineering.py --calendar
+
+    # Кореляції features з targets разом з p-values:
+    python temporal_feature_engineering.py --pvalues
+
+    # Потоково (out-of-core) у Parquet, пам'ять ~ розміру chunk:
+    python temporal_feature_engineering.py --stream --chunk-rows 100000
+
+    # Parquet замість CSV (float32 де дозволяє точність, project як словник):
+    python temporal_feature_engineering.py --format parquet
 """
 
+import os
+import sys
 import warnings
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from feature_block import FeatureBlock
+from matrix_stats import correlation_screen
+from temporal_features import (
+    TemporalFeatureSpec,
+    downcast_float_columns,
+    engineer_window_features,
+    interaction_inputs,
+    merge_incremental,
+    new_snapshots,
+    plan_temporal_features,
+    read_feature_table,
+    sort_project_blocks,
+    stream_temporal_features,
+    tail_rows,
+    time_features,
+    write_feature_table,
+)
+
 warnings.filterwarnings("ignore")
 
 print("=" * 80)
 print("TEMPORAL FEATURE ENGINEERING")
 print("=" * 80)
 
+# Feature configuration (the planner shares lags and window sums between
+# families, so adding a period here only costs its own outputs)
+spec = TemporalFeatureSpec(
+    lag_periods=(1, 2, 3),  # 1, 2, 3 months ago
+    rolling_windows=(2, 3),  # 2-month, 3-month windows
+    rolling_stats=("mean", "std", "min", "max"),
+    trend_windows=(2, 3),  # 2-month, 3-month trends
+    momentum_periods=(1, 2),  # 1-month, 2-month momentum
+    volatility_windows=(3,),  # 3-month volatility
+)
+plan = plan_temporal_features(spec)
+
+# Output format: csv (default) or parquet
+output_format = "csv"
+if "--format" in sys.argv[1:]:
+    output_format = sys.argv[sys.argv.index("--format") + 1]
+    if output_format not in ("csv", "parquet"):
+        print(f"❌ Unknown output format: {output_format}")
+        sys.exit(1)
+# Measure periods in calendar months instead of rows (irregular snapshots)
+calendar_mode = "--calendar" in sys.argv[1:]
+
+# Add p-values to the feature-target correlation screen
+report_pvalues = "--pvalues" in sys.argv[1:]
+
+# Worker processes for feature generation (1 = serial, 0 = all cores)
+workers = 1
+if "--workers" in sys.argv[1:]:
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) or os.cpu_count()
+
+# Out-of-core mode: project-aligned chunks appended to a Parquet file
+stream_mode = "--stream" in sys.argv[1:]
+chunk_rows = 100_000
+if "--chunk-rows" in sys.argv[1:]:
+    chunk_rows = int(sys.argv[sys.argv.index("--chunk-rows") + 1])
+if stream_mode:
+    if "--incremental" in sys.argv[1:]:
+        print("❌ --stream не поєднується з --incremental")
+        sys.exit(1)
+    output_format = "parquet"
+
+output_path = f"../reports/temporal/engineered_features_temporal.{output_format}"
+input_path = "../reports/metrics_report_temporal_long.csv"
+targets = ["bi_timeToMarket", "bi_communityGrowth"]
+
+
+def save_feature_list(feature_list):
+    """Save the engineered feature inventory."""
+    feature_df = pd.DataFrame({"Feature": feature_list})
+    feature_df.to_csv("../reports/temporal/feature_list_temporal.csv", index=False)
+    print(f"✅ Збережено feature list: reports/temporal/feature_list_temporal.csv")
+
+
+def save_feature_importance(screen, feature_list, targets):
+    """Save feature-target correlations (sorted by |r| within target)."""
+    importance_results = []
+
+    for j, target in enumerate(targets):
+        for i, feat in enumerate(feature_list):
+            corr = screen["r"][i, j]
+            if feat != target and not np.isnan(corr):
+                row = {
+                    "Target": target,
+                    "Feature": feat,
+                    "Correlation": corr,
+                    "N": screen["n"][i, j],
+                }
+                if "p" in screen:
+                    row["P-value"] = screen["p"][i, j]
+                importance_results.append(row)
+
+    importance_df = pd.DataFrame(importance_results)
+    importance_df = importance_df.sort_values(
+        ["Target", "Correlation"],
+        key=lambda x: abs(x) if x.name == "Correlation" else x,
+        ascending=[True, False],
+    )
+    importance_df.to_csv(
+        "../reports/temporal/temporal_feature_importance.csv", index=False
+    )
+    print(f"✅ Збережено feature importance analysis")
+
+
+# Streaming: never holds more than one chunk of projects in memory
+if stream_mode:
+    print(f"\n🌊 Потокова обробка {input_path} (chunks по ~{chunk_rows} rows)...")
+    try:
+        summary = stream_temporal_features(
+            input_path,
+            output_path,
+            plan,
+            chunk_rows=chunk_rows,
+            calendar=calendar_mode,
+            workers=workers,
+            targets=targets,
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ Збережено: {output_path}")
+    print(f"   Shape: ({summary['rows']}, {len(summary['columns'])})")
+    print(f"   Projects: {summary['projects']}")
+
+    feature_list = [c for c in summary["columns"] if c not in ["project", "date"]]
+    save_feature_list(feature_list)
+
+    print("\n📊 Calculating feature importance (correlation with targets)...")
+    save_feature_importance(
+        summary["screen"].result(pvalues=report_pvalues), feature_list, targets
+    )
+    sys.exit(0)
+
 # ============================================================================
 # 1. LOAD TEMPORAL DATA
 # ============================================================================
 print("\n📊 Завантаження temporal data...")
-df = pd.read_csv("../reports/metrics_report_temporal_long.csv")
+df = pd.read_csv(input_path)
 df["date"] = pd.to_datetime(df["date"])
 
-# Sort by project and date
-df = df.sort_values(["project", "date"])
+# Sort by project and date (each project becomes a contiguous block)
+df = sort_project_blocks(df)
 
 print(f"✅ Завантажено {len(df)} records")
 print(f"   Projects: {df['project'].nunique()}")
@@ -37,223 +193,137 @@ print(f"   Time periods: {df['date'].nunique()}")
 # Numeric columns (exclude project, date)
 numeric_cols = [col for col in df.columns if col not in ["project", "date"]]
 
-# ============================================================================
-# 2. LAG FEATURES
-# ============================================================================
-print("\n🔄 Створення lag features...")
-
-lag_periods = [1, 2, 3]  # 1, 2, 3 months ago
-lag_count = 0
+# Incremental mode: only new snapshots plus the per-project tail they need
+existing = None
+if "--incremental" in sys.argv[1:] and Path(output_path).exists():
+    existing = read_feature_table(output_path)
+    existing["project"] = existing["project"].astype(str)
 
-for col in numeric_cols:
-    for lag in lag_periods:
-        lag_col = f"{col}_lag_{lag}m"
-        df[lag_col] = df.groupby("project")[col].shift(lag)
-        lag_count += 1
+    try:
+        new_rows = new_snapshots(df, existing)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if new_rows.empty:
+        print("✅ Нових snapshots немає, features актуальні")
+        sys.exit(0)
+
+    # Rows this far back still influence features of the next snapshot
+    history = tail_rows(
+        existing[existing["project"].isin(new_rows["project"].unique())][df.columns],
+        spec.history_length(),
+    )
+    df = sort_project_blocks(
+        pd.concat(
+            [history.assign(_is_new=False), new_rows.assign(_is_new=True)],
+            ignore_index=True,
+        )
+    )
+    is_new = df.pop("_is_new").to_numpy()
 
-print(
-    f"✅ Створено {lag_count} lag features ({len(numeric_cols)} metrics × {len(lag_periods)} lags)"
-)
+    print(
+        f"🔁 Інкрементальний режим: {len(new_rows)} нових snapshots "
+        f"({new_rows['project'].nunique()} projects, {len(history)} rows історії)"
+    )
 
 # ============================================================================
-# 3. ROLLING STATISTICS
+# 2. LAG, ROLLING, TREND, MOMENTUM & VOLATILITY FEATURES
 # ============================================================================
-print("\n📊 Створення rolling statistics...")
-
-rolling_windows = [2, 3]  # 2-month, 3-month windows
-rolling_stats = ["mean", "std", "min", "max"]
-rolling_count = 0
-
-for col in numeric_cols:
-    for window in rolling_windows:
-        # Mean
-        df[f"{col}_rolling_{window}m_mean"] = (
-            df.groupby("project")[col]
-            .rolling(window=window, min_periods=1)
-            .mean()
-            .reset_index(level=0, drop=True)
-        )
-
-        # Std
-        df[f"{col}_rolling_{window}m_std"] = (
-            df.groupby("project")[col]
-            .rolling(window=window, min_periods=1)
-            .std()
-            .reset_index(level=0, drop=True)
-        )
-
-        # Min
-        df[f"{col}_rolling_{window}m_min"] = (
-            df.groupby("project")[col]
-            .rolling(window=window, min_periods=1)
-            .min()
-            .reset_index(level=0, drop=True)
-        )
-
-        # Max
-        df[f"{col}_rolling_{window}m_max"] = (
-            df.groupby("project")[col]
-            .rolling(window=window, min_periods=1)
-            .max()
-            .reset_index(level=0, drop=True)
-        )
+print("\n🔄 Створення lag, rolling, trend, momentum та volatility features...")
+
+# The output schema is known up front: every float feature (window and
+# interaction) is written in place into one preallocated block, which
+# becomes a DataFrame once in section 4
+window_names = plan.feature_names(numeric_cols)
+interaction_schema = interaction_inputs(numeric_cols + window_names)
+feature_block = FeatureBlock(
+    window_names + [name for name, _, _ in interaction_schema], index=df.index
+)
 
-        rolling_count += 4
+# One pass over contiguous project blocks for all metrics and windows,
+# optionally sharded by project across worker processes
+try:
+    window_features = engineer_window_features(
+        df,
+        numeric_cols,
+        plan,
+        calendar=calendar_mode,
+        workers=workers,
+        out=feature_block.region(window_names),
+    )
+except ValueError as e:
+    print(f"❌ {e}")
+    sys.exit(1)
+if calendar_mode:
+    print("📅 Календарний режим: періоди в календарних місяцях")
+
+lag_count = plan.count("lag") * len(numeric_cols)
+rolling_count = plan.count("rolling") * len(numeric_cols)
+trend_count = plan.count("trend") * len(numeric_cols)
+momentum_count = plan.count("momentum") * len(numeric_cols)
+volatility_count = plan.count("volatility") * len(numeric_cols)
 
 print(
-    f"✅ Створено {rolling_count} rolling features ({len(numeric_cols)} metrics × {len(rolling_windows)} windows × 4 stats)"
+    f"✅ Створено {lag_count} lag features ({len(numeric_cols)} metrics × {len(spec.lag_periods)} lags)"
 )
-
-# ============================================================================
-# 4. TREND FEATURES (Linear Regression Slopes)
-# ============================================================================
-print("\n📈 Створення trend features...")
-
-trend_windows = [2, 3]  # 2-month, 3-month trends
-trend_count = 0
-
-
-def calculate_trend(series):
-    """Calculate linear trend slope"""
-    if len(series) < 2 or series.isna().all():
-        return np.nan
-
-    x = np.arange(len(series))
-    y = series.values
-
-    # Remove NaN
-    mask = ~np.isnan(y)
-    if mask.sum() < 2:
-        return np.nan
-
-    try:
-        slope = np.polyfit(x[mask], y[mask], 1)[0]
-        return slope
-    except:
-        return np.nan
-
-
-for col in numeric_cols:
-    for window in trend_windows:
-        trend_col = f"{col}_trend_{window}m"
-        df[trend_col] = (
-            df.groupby("project")[col]
-            .rolling(window=window, min_periods=2)
-            .apply(calculate_trend, raw=False)
-            .reset_index(level=0, drop=True)
-        )
-        trend_count += 1
-
 print(
-    f"✅ Створено {trend_count} trend features ({len(numeric_cols)} metrics × {len(trend_windows)} windows)"
+    f"✅ Створено {rolling_count} rolling features ({len(numeric_cols)} metrics × {len(spec.rolling_windows)} windows × {len(spec.rolling_stats)} stats)"
 )
-
-# ============================================================================
-# 5. MOMENTUM FEATURES (Rate of Change)
-# ============================================================================
-print("\n⚡ Створення momentum features...")
-
-momentum_periods = [1, 2]  # 1-month, 2-month momentum
-momentum_count = 0
-
-for col in numeric_cols:
-    for period in momentum_periods:
-        momentum_col = f"{col}_momentum_{period}m"
-
-        # Momentum = (current - previous) / previous * 100
-        df[momentum_col] = df.groupby("project")[col].pct_change(periods=period) * 100
-        momentum_count += 1
-
 print(
-    f"✅ Створено {momentum_count} momentum features ({len(numeric_cols)} metrics × {len(momentum_periods)} periods)"
+    f"✅ Створено {trend_count} trend features ({len(numeric_cols)} metrics × {len(spec.trend_windows)} windows)"
+)
+print(
+    f"✅ Створено {momentum_count} momentum features ({len(numeric_cols)} metrics × {len(spec.momentum_periods)} periods)"
 )
-
-# ============================================================================
-# 6. VOLATILITY FEATURES (Rolling Coefficient of Variation)
-# ============================================================================
-print("\n📉 Створення volatility features...")
-
-volatility_windows = [3]  # 3-month volatility
-volatility_count = 0
-
-for col in numeric_cols:
-    for window in volatility_windows:
-        volatility_col = f"{col}_volatility_{window}m"
-
-        # CV = (std / mean) * 100
-        rolling_mean = (
-            df.groupby("project")[col]
-            .rolling(window=window, min_periods=2)
-            .mean()
-            .reset_index(level=0, drop=True)
-        )
-
-        rolling_std = (
-            df.groupby("project")[col]
-            .rolling(window=window, min_periods=2)
-            .std()
-            .reset_index(level=0, drop=True)
-        )
-
-        # Avoid division by zero
-        df[volatility_col] = np.where(
-            rolling_mean != 0, (rolling_std / rolling_mean) * 100, np.nan
-        )
-
-        volatility_count += 1
-
 print(
-    f"✅ Створено {volatility_count} volatility features ({len(numeric_cols)} metrics × {len(volatility_windows)} windows)"
+    f"✅ Створено {volatility_count} volatility features ({len(numeric_cols)} metrics × {len(spec.volatility_windows)} windows)"
 )
 
 # ============================================================================
-# 7. TEMPORAL INTERACTION FEATURES
+# 3. TEMPORAL INTERACTION FEATURES
 # ============================================================================
 print("\n🔗 Створення temporal interaction features...")
 
-interaction_count = 0
-
-# Trend × Current value interactions
-for col in ["dx_codeReviewDuration", "tp_testCoverage", "bi_timeToMarket"]:
-    if col in df.columns and f"{col}_trend_3m" in df.columns:
-        df[f"{col}_trend_value_interaction"] = df[col] * df[f"{col}_trend_3m"]
-        interaction_count += 1
-
-# Momentum × Volatility
-for col in ["dx_codeReviewDuration", "bi_communityGrowth"]:
-    if f"{col}_momentum_1m" in df.columns and f"{col}_volatility_3m" in df.columns:
-        df[f"{col}_momentum_volatility"] = (
-            df[f"{col}_momentum_1m"] * df[f"{col}_volatility_3m"]
-        )
-        interaction_count += 1
+# Trend × Current value, Momentum × Volatility
+for name, left, right in interaction_schema:
+    if left in window_features:
+        left_values = window_features[left]
+    else:
+        left_values = df[left].to_numpy(dtype=float)
+    feature_block[name] = left_values * window_features[right]
+interaction_count = len(interaction_schema)
 
 print(f"✅ Створено {interaction_count} temporal interaction features")
 
 # ============================================================================
-# 8. TIME-BASED FEATURES
+# 4. TIME-BASED FEATURES
 # ============================================================================
 print("\n📅 Створення time-based features...")
 
-# Month number (1-6 for 6 months)
-df["month_number"] = df.groupby("project").cumcount() + 1
-
-# Days since first snapshot
-df["days_since_start"] = df.groupby("project")["date"].transform(
-    lambda x: (x - x.min()).dt.days
+# Month number (1-6 for 6 months; calendar months since the first
+# snapshot in calendar mode), days since first snapshot, quarter and
+# is-last-month flag
+df = pd.concat(
+    [
+        df,
+        feature_block.to_frame(),
+        pd.DataFrame(
+            time_features(df["project"], df["date"], calendar=calendar_mode),
+            index=df.index,
+        ),
+    ],
+    axis=1,
 )
 
-# Quarter (if applicable)
-df["quarter"] = df["date"].dt.quarter
-
-# Is last month (binary)
-df["is_last_month"] = (
-    df.groupby("project")["month_number"].transform("max") == df["month_number"]
-).astype(int)
-
 print("✅ Створено 4 time-based features")
 
+if existing is not None:
+    df = merge_incremental(existing, df, is_new, calendar=calendar_mode)
+    print(f"✅ Дописано {int(is_new.sum())} rows до {len(existing)} existing")
+
 # ============================================================================
-# 9. FEATURE SUMMARY
+# 5. FEATURE SUMMARY
 # ============================================================================
 print("\n" + "=" * 80)
 print("FEATURE SUMMARY")
@@ -276,50 +346,32 @@ print(f"  • Interaction features: {interaction_count}")
 print(f"  • Time-based features: 4")
 
 # ============================================================================
-# 10. SAVE ENGINEERED FEATURES
+# 6. SAVE ENGINEERED FEATURES
 # ============================================================================
 print("\n💾 Збереження engineered features...")
 
-# Save full temporal dataset with all features
-output_path = "../reports/temporal/engineered_features_temporal.csv"
-df.to_csv(output_path, index=False)
+# Save full temporal dataset with all features (raw metrics stay float64
+# so that incremental runs continue from exact values)
+if output_format == "parquet":
+    write_feature_table(downcast_float_columns(df, exclude=numeric_cols), output_path)
+else:
+    write_feature_table(df, output_path)
 
 print(f"✅ Збережено: {output_path}")
 print(f"   Shape: {df.shape}")
 
 # Save feature list
 feature_list = [col for col in df.columns if col not in ["project", "date"]]
-feature_df = pd.DataFrame({"Feature": feature_list})
-feature_df.to_csv("../reports/temporal/feature_list_temporal.csv", index=False)
-
-print(f"✅ Збережено feature list: reports/temporal/feature_list_temporal.csv")
+save_feature_list(feature_list)
 
 # Save feature importance (correlation with targets)
 print("\n📊 Calculating feature importance (correlation with targets)...")
 
-targets = ["bi_timeToMarket", "bi_communityGrowth"]
-importance_results = []
-
-for target in targets:
-    if target in df.columns:
-        for feat in feature_list:
-            if feat != target and feat in df.columns:
-                # Calculate correlation
-                corr = df[[feat, target]].corr().iloc[0, 1]
-                if not np.isnan(corr):
-                    importance_results.append(
-                        {"Target": target, "Feature": feat, "Correlation": corr}
-                    )
-
-importance_df = pd.DataFrame(importance_results)
-importance_df = importance_df.sort_values(
-    ["Target", "Correlation"],
-    key=lambda x: abs(x) if x.name == "Correlation" else x,
-    ascending=[True, False],
-)
-importance_df.to_csv("../reports/temporal/temporal_feature_importance.csv", index=False)
-
-print(f"✅ Збережено feature importance analysis")
+# All feature × target correlations at once (pairwise-complete, as
+# DataFrame.corr()), with the number of rows behind each one
+targets = [t for t in targets if t in df.columns]
+screen = correlation_screen(df[feature_list], df[targets], pvalues=report_pvalues)
+save_feature_importance(screen, feature_list, targets)
 
 print("\n" + "=" * 80)
 print("TEMPORAL FEATURE ENGINEERING COMPLETE")
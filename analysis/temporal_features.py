@@ -0,0 +1,1063 @@
+#!/usr/bin/env python3
+"""
+Temporal Feature Engine
+Векторизовані обчислення temporal features по проектах
+
+Дані сортуються один раз за (project, date), після чого кожен проект -
+це суцільний блок рядків 2-D NumPy масиву. Зсуви всередині проекту
+дають усі вікна одразу для всіх метрик, без groupby на кожну колонку.
+
+Використання:
+    from temporal_features import (
+        TemporalFeatureSpec, plan_temporal_features, compute_temporal_features,
+        sort_project_blocks, project_positions,
+    )
+
+    df = sort_project_blocks(df)
+    position = project_positions(df["project"])
+    plan = plan_temporal_features(TemporalFeatureSpec(rolling_windows=(2, 3, 6)))
+    features = compute_temporal_features(
+        df[numeric_cols].to_numpy(float), position, plan, numeric_cols
+    )  # {"<metric>_rolling_6m_mean": array, ...}
+
+Магістерська робота: Outcome-based оцінка якості TypeScript коду
+Автор: Слабенко Костянтин Олегович
+Група: АС-202
+Одеський політехнічний національний університет
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from feature_block import FeatureBlock
+from matrix_stats import PairwiseCorrelation
+
+ROLLING_STATS = ("mean", "std", "min", "max")
+
+# Rows per tile when compute_temporal_features() lays blocks out into its
+# output (a few hundred KB of every block, so a tile stays in cache)
+LAYOUT_TILE_ROWS = 4096
+
+
+def sort_project_blocks(df, project_col="project", date_col="date"):
+    """
+    Sort rows by project and date once, so every project is a contiguous block.
+
+    A stable sort is used, so rows with equal (project, date) keep their
+    input order, as with the original sort_values() call.
+    """
+    return df.sort_values([project_col, date_col], kind="mergesort")
+
+
+def project_positions(projects):
+    """
+    0-based position of every row within its project block.
+
+    projects must already be sorted so that each project is contiguous
+    (see sort_project_blocks()).
+    """
+    codes = np.asarray(projects)
+    n_rows = len(codes)
+    if n_rows == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    is_start = np.empty(n_rows, dtype=bool)
+    is_start[0] = True
+    is_start[1:] = codes[1:] != codes[:-1]
+
+    starts = np.flatnonzero(is_start)
+    lengths = np.diff(np.append(starts, n_rows))
+    return np.arange(n_rows) - np.repeat(starts, lengths)
+
+
+def shift_within_projects(values, position, k):
+    """
+    Value of each row k rows earlier in the same project (NaN when the
+    project has fewer than k earlier rows), like groupby().shift(k).
+    """
+    values = np.asarray(values, dtype=float)
+    if k == 0:
+        return values.copy()
+
+    shifted = np.full(values.shape, np.nan)
+    if k < len(values):
+        shifted[k:] = values[:-k]
+        shifted[position < k] = np.nan
+    return shifted
+
+
+def window_sweep(
+    values, position, windows, moments=True, extrema=True, trend=False, shifted=None
+):
+    """
+    Shared accumulators of trailing windows, from one sweep over the lags.
+
+    Returns a dict mapping window to a dict of (n_rows, n_cols) arrays:
+    "count" (valid values), plus "mean" and "std" (ddof=1) if moments,
+    "min" and "max" if extrema, and the least-squares "slope" against the
+    row index if trend. shifted may map lags to precomputed
+    shift_within_projects() arrays to reuse. No min_periods masking is applied beyond what the
+    statistic itself needs (std and slope are NaN below 2 valid values).
+
+    Moments and slopes are accumulated as deviations from the most recent
+    valid value in the window (x as minus the lag), which leaves them
+    unchanged but keeps the sums small, so constant windows give exactly
+    their value as mean and 0 as std and slope.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    windows = sorted(set(int(w) for w in windows))
+    if not windows or windows[0] < 1:
+        raise ValueError("Window lengths must be positive integers")
+
+    count = np.zeros(values.shape)
+    pivot = np.full(values.shape, np.nan)
+    sum_y = np.zeros(values.shape)
+    sum_yy = np.zeros(values.shape)
+    sum_x = np.zeros(values.shape)
+    sum_xx = np.zeros(values.shape)
+    sum_xy = np.zeros(values.shape)
+    lowest = np.full(values.shape, np.nan)
+    highest = np.full(values.shape, np.nan)
+
+    results = {}
+    shifted = shifted or {}
+    for k in range(windows[-1]):
+        lagged = shifted.get(k)
+        if lagged is None:
+            lagged = shift_within_projects(values, position, k)
+        valid = ~np.isnan(lagged)
+        count += valid
+        if moments or trend:
+            pivot = np.where(np.isnan(pivot), lagged, pivot)
+            y = np.where(valid, lagged - pivot, 0.0)
+            sum_y += y
+        if moments:
+            sum_yy += y * y
+        if trend:
+            x = -float(k)
+            sum_x += valid * x
+            sum_xx += valid * (x * x)
+            sum_xy += x * y
+        if extrema:
+            lowest = np.fmin(lowest, lagged)
+            highest = np.fmax(highest, lagged)
+
+        window = k + 1
+        if window not in windows:
+            continue
+
+        snapshot = {"count": count.copy()}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if moments:
+                snapshot["mean"] = pivot + sum_y / count
+                variance = (sum_yy - sum_y * sum_y / count) / (count - 1)
+                snapshot["std"] = np.where(
+                    count >= 2, np.sqrt(np.maximum(variance, 0.0)), np.nan
+                )
+            if trend:
+                slope = (count * sum_xy - sum_x * sum_y) / (
+                    count * sum_xx - sum_x * sum_x
+                )
+                snapshot["slope"] = np.where(count >= 2, slope, np.nan)
+        if extrema:
+            snapshot["min"] = lowest.copy()
+            snapshot["max"] = highest.copy()
+        results[window] = snapshot
+
+    return results
+
+
+def rolling_statistics(values, position, windows, stats=ROLLING_STATS, min_periods=1):
+    """
+    Trailing rolling statistics of every column for several window lengths.
+
+    values is a (n_rows, n_cols) array sorted by project and date, and
+    position comes from project_positions(). Returns a dict mapping
+    (window, stat) to a (n_rows, n_cols) array, with the same semantics as
+    groupby("project")[col].rolling(window, min_periods).<stat>(): NaNs are
+    skipped, a window with fewer than min_periods valid values is NaN, and
+    std uses ddof=1 (NaN for a single value). Constant windows give exactly
+    0 as std (pandas' running sums can leave ~1e-6 residue there).
+    """
+    stats = tuple(stats)
+    unknown = set(stats) - set(ROLLING_STATS)
+    if unknown:
+        raise ValueError(f"Unknown rolling statistics: {sorted(unknown)}")
+
+    sweep = window_sweep(
+        values,
+        position,
+        windows,
+        moments="mean" in stats or "std" in stats,
+        extrema="min" in stats or "max" in stats,
+    )
+    return {
+        (window, stat): np.where(acc["count"] >= min_periods, acc[stat], np.nan)
+        for window, acc in sweep.items()
+        for stat in stats
+    }
+
+
+def rolling_trend(values, position, windows, min_periods=2):
+    """
+    Least-squares slope of every trailing window, in closed form.
+
+    Equivalent to np.polyfit(x, y, 1)[0] over every
+    groupby("project")[col].rolling(window, min_periods) window: x is the
+    row index within the window, NaN values are dropped, and windows with
+    fewer than max(min_periods, 2) valid values are NaN (see
+    tests/test_temporal_features.py). Returns a dict mapping window to a
+    (n_rows, n_cols) array.
+
+    The slope is (n*Sxy - Sx*Sy) / (n*Sxx - Sx^2) from rolling sums over
+    the valid points (see window_sweep()).
+    """
+    sweep = window_sweep(
+        values, position, windows, moments=False, extrema=False, trend=True
+    )
+    return {
+        window: np.where(acc["count"] >= min_periods, acc["slope"], np.nan)
+        for window, acc in sweep.items()
+    }
+
+
+def momentum(values, shifted):
+    """Percent change against an earlier value, like pct_change() * 100."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (values / shifted - 1) * 100
+
+
+def volatility(mean, std):
+    """Coefficient of variation in percent, NaN where the mean is 0."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(mean != 0, (std / mean) * 100, np.nan)
+
+
+@dataclass(frozen=True)
+class TemporalFeatureSpec:
+    """
+    Declarative description of the window-based temporal features.
+
+    Every field lists the periods (in snapshots) of one feature family;
+    plan_temporal_features() turns it into a single lag sweep. Feature
+    names follow <metric>_<family>_<period>m[_<stat>].
+    """
+
+    lag_periods: tuple = (1, 2, 3)
+    rolling_windows: tuple = (2, 3)
+    rolling_stats: tuple = ROLLING_STATS
+    trend_windows: tuple = (2, 3)
+    momentum_periods: tuple = (1, 2)
+    volatility_windows: tuple = (3,)
+
+    def history_length(self):
+        """Number of earlier rows that still influence the features of a row."""
+        return max(
+            [0]
+            + list(self.lag_periods)
+            + list(self.momentum_periods)
+            + [
+                w - 1
+                for w in self.rolling_windows
+                + self.trend_windows
+                + self.volatility_windows
+            ]
+        )
+
+
+@dataclass
+class TemporalFeaturePlan:
+    """
+    Deduplicated computation graph of a TemporalFeatureSpec.
+
+    shifts are the in-project lags materialized once and shared by lag and
+    momentum features; windows maps every window length to the accumulator
+    groups of window_sweep() it needs, shared by rolling, trend and
+    volatility features; outputs lists (family, period, stat) in output
+    order.
+    """
+
+    spec: TemporalFeatureSpec
+    shifts: tuple
+    windows: dict
+    outputs: list = field(default_factory=list)
+
+    def count(self, family):
+        """Number of outputs of one feature family per metric."""
+        return sum(1 for output in self.outputs if output[0] == family)
+
+    def feature_names(self, columns):
+        """Output feature names for the given metric columns, in output order."""
+        return [name for name, _, _ in self._layout(columns)]
+
+    def _layout(self, columns):
+        # Families are grouped, then metrics, then periods (the order the
+        # original per-section loops produced)
+        for family in ("lag", "rolling", "trend", "momentum", "volatility"):
+            family_outputs = [o for o in self.outputs if o[0] == family]
+            for j, col in enumerate(columns):
+                for output in family_outputs:
+                    _, period, stat = output
+                    suffix = f"_{stat}" if stat else ""
+                    yield f"{col}_{family}_{period}m{suffix}", j, output
+
+
+def plan_temporal_features(spec):
+    """
+    Turn a TemporalFeatureSpec into a TemporalFeaturePlan.
+
+    Lags and momentum periods share one set of shifts. Rolling, trend and
+    volatility windows share the counts and pivot sums of one window sweep:
+    volatility reuses the rolling mean and std of its window instead of
+    computing them again, and a window used by several families is swept
+    once. Adding a window only adds its own outputs.
+    """
+    outputs = []
+    windows = {}
+
+    def need(window, group):
+        windows.setdefault(int(window), set()).add(group)
+
+    for lag in spec.lag_periods:
+        outputs.append(("lag", int(lag), None))
+    for window in spec.rolling_windows:
+        for stat in spec.rolling_stats:
+            if stat not in ROLLING_STATS:
+                raise ValueError(f"Unknown rolling statistic: {stat}")
+            outputs.append(("rolling", int(window), stat))
+            need(window, "extrema" if stat in ("min", "max") else "moments")
+    for window in spec.trend_windows:
+        outputs.append(("trend", int(window), None))
+        need(window, "trend")
+    for period in spec.momentum_periods:
+        outputs.append(("momentum", int(period), None))
+    for window in spec.volatility_windows:
+        outputs.append(("volatility", int(window), None))
+        need(window, "moments")
+
+    shifts = tuple(
+        sorted(set(int(p) for p in spec.lag_periods + spec.momentum_periods))
+    )
+    if any(k < 1 for k in shifts) or any(w < 1 for w in windows):
+        raise ValueError("Feature periods must be positive integers")
+
+    return TemporalFeaturePlan(spec, shifts, windows, outputs)
+
+
+def compute_temporal_features(values, position, plan, columns, out=None):
+    """
+    Execute a TemporalFeaturePlan over a (n_rows, len(columns)) array.
+
+    Returns a dict mapping feature name to a 1-D array, in output order,
+    with the semantics of the original per-section pandas code: lags are
+    groupby().shift(), rolling statistics use min_periods=1, trends and
+    volatility min_periods=2, momentum is pct_change() * 100.
+
+    Features are written into out, a (n_rows, n_features) float array in
+    output order (allocated if None), and the returned columns are views
+    into it.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+
+    shifted = {k: shift_within_projects(values, position, k) for k in plan.shifts}
+
+    # One sweep serves every window; it reuses the lag shifts above
+    groups = set().union(*plan.windows.values()) if plan.windows else set()
+    sweeps = {}
+    if plan.windows:
+        sweeps = window_sweep(
+            values,
+            position,
+            plan.windows,
+            moments="moments" in groups,
+            extrema="extrema" in groups,
+            trend="trend" in groups,
+            shifted=shifted,
+        )
+
+    blocks = {}
+    for output in plan.outputs:
+        family, period, stat = output
+        if family == "lag":
+            blocks[output] = shifted[period]
+        elif family == "momentum":
+            blocks[output] = momentum(values, shifted[period])
+        else:
+            acc = sweeps[period]
+            if family == "rolling":
+                blocks[output] = np.where(acc["count"] >= 1, acc[stat], np.nan)
+            elif family == "trend":
+                blocks[output] = np.where(acc["count"] >= 2, acc["slope"], np.nan)
+            else:
+                enough = acc["count"] >= 2
+                blocks[output] = volatility(
+                    np.where(enough, acc["mean"], np.nan),
+                    np.where(enough, acc["std"], np.nan),
+                )
+
+    layout = list(plan._layout(columns))
+    if out is None:
+        out = np.empty((len(values), len(layout)), order="F")
+    targets = {}
+    for k, (_, j, output) in enumerate(layout):
+        targets.setdefault(output, np.empty(values.shape[1], dtype=np.intp))[j] = k
+    # Blocks are row-major and out is usually column-major (FeatureBlock):
+    # copy whole blocks in row tiles, so neither side is walked one strided
+    # column at a time
+    for start in range(0, len(values), LAYOUT_TILE_ROWS):
+        stop = start + LAYOUT_TILE_ROWS
+        for output, columns_k in targets.items():
+            out[start:stop, columns_k] = blocks[output][start:stop]
+    return {name: out[:, k] for k, (name, _, _) in enumerate(layout)}
+
+
+def project_shards(position, n_shards):
+    """
+    Split rows into at most n_shards contiguous [start, stop) ranges of
+    similar size that never cut through a project block.
+    """
+    n_rows = len(position)
+    if n_rows == 0:
+        return []
+
+    starts = np.flatnonzero(np.asarray(position) == 0)
+    targets = np.linspace(0, n_rows, max(1, int(n_shards)) + 1)[1:-1]
+    # First project start at or after each target (n_rows past the last one)
+    cuts = np.append(starts, n_rows)[np.searchsorted(starts, targets)]
+
+    bounds = np.unique(np.concatenate([[0], cuts, [n_rows]]))
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _feature_shard(task):
+    """Worker: compute one shard of a plan from shared memory, in place."""
+    values_ref, position_ref, output_ref, start, stop, plan, columns = task
+
+    segments, views = [], []
+    try:
+        for name, shape, dtype in (values_ref, position_ref, output_ref):
+            segment = shared_memory.SharedMemory(name=name)
+            segments.append(segment)
+            views.append(np.ndarray(shape, dtype=dtype, buffer=segment.buf))
+        values, position, output = views
+
+        compute_temporal_features(
+            values[start:stop],
+            position[start:stop],
+            plan,
+            columns,
+            out=output[start:stop],
+        )
+    finally:
+        # Views must be released before the segments can be closed
+        values = position = output = None
+        views.clear()
+        for segment in segments:
+            segment.close()
+
+    return stop - start
+
+
+def _shared_array(shape, dtype, segments, source=None):
+    """Allocate a shared-memory array (optionally filled from source)."""
+    nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+    segment = shared_memory.SharedMemory(create=True, size=nbytes)
+    segments.append(segment)
+    if source is not None:
+        view = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        view[...] = source
+        del view
+    return segment.name, shape, dtype.str
+
+
+def compute_temporal_features_parallel(
+    values, position, plan, columns, workers=None, shards=None, out=None
+):
+    """
+    compute_temporal_features() over project shards in a process pool.
+
+    The input values and positions are placed in shared memory once, and
+    every worker writes its rows of one (n_rows, n_features) output array
+    in shared memory, so neither inputs nor results are pickled. Shards
+    never split a project and features only look back within a project,
+    so the result is identical to the serial call whatever the number of
+    workers. Returns the same dict as compute_temporal_features(), with
+    columns as views into one contiguous array (out, if given).
+
+    Worker processes are forked (the calling script has no __main__
+    guard); where fork is unavailable, or with one worker, the serial path
+    is used.
+    """
+    values = np.ascontiguousarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    position = np.ascontiguousarray(position, dtype=np.int64)
+    names = plan.feature_names(columns)
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return compute_temporal_features(values, position, plan, columns, out=out)
+
+    bounds = project_shards(position, shards or workers * 4)
+    output_shape = (len(values), len(names))
+
+    segments = []
+    try:
+        values_ref = _shared_array(values.shape, values.dtype, segments, values)
+        position_ref = _shared_array(position.shape, position.dtype, segments, position)
+        output_ref = _shared_array(output_shape, np.dtype(float), segments)
+        refs = (values_ref, position_ref, output_ref)
+
+        tasks = [(*refs, start, stop, plan, columns) for start, stop in bounds]
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for _ in pool.map(_feature_shard, tasks):
+                pass
+
+        shared_output = np.ndarray(output_shape, dtype=float, buffer=segments[2].buf)
+        if out is None:
+            out = shared_output.copy()
+        else:
+            out[...] = shared_output
+        del shared_output
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    return {name: out[:, j] for j, name in enumerate(names)}
+
+
+def month_index(dates):
+    """Calendar month ordinal (year * 12 + month - 1) of every date."""
+    dates = pd.Series(pd.to_datetime(dates))
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+
+
+def calendar_grid(projects, months):
+    """
+    Map rows onto a dense monthly grid that spans each project from its
+    first to its last snapshot.
+
+    projects must be sorted into contiguous blocks with months increasing
+    inside each block. Returns (dense_index, dense_position, n_dense): row i
+    lands on grid row dense_index[i], and dense_position is the month
+    offset of every grid row within its project. Months without a snapshot
+    stay empty on the grid, so shifting by k grid rows means k calendar
+    months. Only rows inside a project's own span are allocated and
+    dense_index is the (sparse) mask of observed months.
+
+    Raises ValueError if a project has two snapshots in the same month.
+    """
+    months = np.asarray(months, dtype=np.int64)
+    position = project_positions(projects)
+    if len(months) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0
+
+    starts = np.flatnonzero(position == 0)
+    lengths = np.diff(np.append(starts, len(months)))
+    offset = months - np.repeat(months[starts], lengths)
+
+    steps = np.diff(offset)
+    if np.any(steps[position[1:] > 0] <= 0):
+        raise ValueError(
+            "Calendar mode needs at most one snapshot per project and month"
+        )
+
+    spans = offset[starts + lengths - 1] + 1
+    grid_starts = np.concatenate([[0], np.cumsum(spans)[:-1]])
+    n_dense = int(spans.sum())
+    dense_index = np.repeat(grid_starts, lengths) + offset
+    dense_position = np.arange(n_dense) - np.repeat(grid_starts, spans)
+    return dense_index, dense_position, n_dense
+
+
+def compute_calendar_features(
+    values, projects, months, plan, columns, workers=1, out=None
+):
+    """
+    compute_temporal_features() with periods measured in calendar months.
+
+    Rows are scattered onto calendar_grid() in one vectorized reindex, the
+    plan runs on the grid (missing months are NaN, so a lag across a gap
+    is NaN and windows skip the missing month), and features are gathered
+    back for the observed rows only (into out, if given). Equivalent to
+    the row-based path when no month is missing.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    dense_index, dense_position, n_dense = calendar_grid(projects, months)
+
+    dense = np.full((n_dense, values.shape[1]), np.nan)
+    dense[dense_index] = values
+    names = plan.feature_names(columns)
+    dense_features = np.empty((n_dense, len(names)))
+    compute_temporal_features_parallel(
+        dense, dense_position, plan, columns, workers=workers, out=dense_features
+    )
+    if out is None:
+        out = dense_features[dense_index]
+    else:
+        np.take(dense_features, dense_index, axis=0, out=out)
+    return {name: out[:, j] for j, name in enumerate(names)}
+
+
+# Metrics whose trend is multiplied by the current value, and whose
+# momentum is multiplied by volatility (temporal interaction features)
+TREND_VALUE_METRICS = ("dx_codeReviewDuration", "tp_testCoverage", "bi_timeToMarket")
+MOMENTUM_VOLATILITY_METRICS = ("dx_codeReviewDuration", "bi_communityGrowth")
+
+
+def engineer_window_features(
+    df, numeric_cols, plan, calendar=False, workers=1, out=None
+):
+    """
+    Lag, rolling, trend, momentum and volatility features of a frame sorted
+    by project and date: compute_temporal_features_parallel(), or
+    compute_calendar_features() when periods are calendar months. out is
+    an optional preallocated (n_rows, n_features) array to fill.
+    """
+    values = df[numeric_cols].to_numpy(dtype=float)
+    if calendar:
+        return compute_calendar_features(
+            values,
+            df["project"],
+            month_index(df["date"]),
+            plan,
+            numeric_cols,
+            workers=workers,
+            out=out,
+        )
+    position = project_positions(df["project"])
+    return compute_temporal_features_parallel(
+        values, position, plan, numeric_cols, workers=workers, out=out
+    )
+
+
+def interaction_inputs(available):
+    """
+    (name, left, right) of every interaction feature whose two inputs are
+    among the available column names, in output order.
+    """
+    available = set(available)
+    inputs = []
+    for col in TREND_VALUE_METRICS:
+        if col in available and f"{col}_trend_3m" in available:
+            inputs.append((f"{col}_trend_value_interaction", col, f"{col}_trend_3m"))
+    for col in MOMENTUM_VOLATILITY_METRICS:
+        left, right = f"{col}_momentum_1m", f"{col}_volatility_3m"
+        if left in available and right in available:
+            inputs.append((f"{col}_momentum_volatility", left, right))
+    return inputs
+
+
+def time_features(projects, dates, calendar=False):
+    """
+    month_number, days_since_start, quarter and is_last_month of rows sorted
+    by project and date. month_number is the snapshot ordinal, or calendar
+    months since the first snapshot with calendar=True.
+    """
+    dates = pd.Series(pd.to_datetime(dates)).reset_index(drop=True)
+    position = project_positions(projects)
+    n_rows = len(position)
+    starts = np.flatnonzero(position == 0)
+    lengths = np.diff(np.append(starts, n_rows))
+    first_date = dates.iloc[np.repeat(starts, lengths)].reset_index(drop=True)
+
+    if calendar:
+        month_number = month_index(dates) - month_index(first_date) + 1
+    else:
+        month_number = position.astype(np.int64) + 1
+    last_month = np.repeat(month_number[starts + lengths - 1], lengths)
+
+    return {
+        "month_number": month_number,
+        "days_since_start": (dates - first_date).dt.days.to_numpy(dtype=np.int64),
+        "quarter": dates.dt.quarter.to_numpy(),
+        "is_last_month": (month_number == last_month).astype(np.int64),
+    }
+
+
+def engineer_temporal_block(df, numeric_cols, plan, calendar=False, workers=1):
+    """
+    All temporal features of complete projects (sorted by project and
+    date), assembled into one frame: the columns of df, window features,
+    interactions and time-based features, in that order.
+    """
+    window_names = plan.feature_names(numeric_cols)
+    interactions = interaction_inputs(list(df.columns) + window_names)
+
+    # All float features go into one preallocated block, filled in place
+    block = FeatureBlock(
+        window_names + [name for name, _, _ in interactions], index=df.index
+    )
+    windows = engineer_window_features(
+        df, numeric_cols, plan, calendar, workers, out=block.region(window_names)
+    )
+    for name, left, right in interactions:
+        if left in windows:
+            left_values = windows[left]
+        else:
+            left_values = df[left].to_numpy(dtype=float)
+        block[name] = left_values * windows[right]
+
+    times = time_features(df["project"], df["date"], calendar)
+    return pd.concat(
+        [df, block.to_frame(), pd.DataFrame(times, index=df.index)], axis=1
+    )
+
+
+def tail_rows(df, length, project_col="project"):
+    """
+    Last `length` rows of every project: the history an incremental run
+    needs to compute lag, rolling, trend, momentum and volatility features
+    for the rows that follow. df must be sorted by project and date.
+    """
+    return df.groupby(project_col, sort=False).tail(length)
+
+
+def new_snapshots(long_df, existing, project_col="project", date_col="date"):
+    """
+    Rows of long_df whose (project, date) is not yet in existing.
+
+    Raises ValueError if a new row is not later than the last existing
+    snapshot of its project, since appending it would change features of
+    rows that were already written (a full rebuild is needed then).
+    """
+    known = pd.MultiIndex.from_frame(existing[[project_col, date_col]])
+    keys = pd.MultiIndex.from_frame(long_df[[project_col, date_col]])
+    fresh = long_df[~keys.isin(known)]
+
+    last_known = existing.groupby(project_col)[date_col].max()
+    previous = fresh[project_col].map(last_known)
+    backfilled = fresh[previous.notna() & (fresh[date_col] <= previous)]
+    if len(backfilled):
+        projects = ", ".join(sorted(backfilled[project_col].astype(str).unique())[:5])
+        raise ValueError(
+            f"{len(backfilled)} new snapshots predate existing ones ({projects}); "
+            "run a full rebuild"
+        )
+    return fresh
+
+
+def merge_incremental(
+    existing, increment, is_new, project_col="project", date_col="date", calendar=False
+):
+    """
+    Append the new rows of an incremental run to the existing feature table.
+
+    increment holds features computed on tail_rows() plus the new snapshots
+    and is_new marks the latter. Every window-based feature only looks at
+    the preceding rows, so those rows are already identical to a full
+    rebuild; the time-based features that depend on the whole project
+    history (month_number, days_since_start, is_last_month) are corrected
+    here from existing. With calendar=True month_number counts calendar
+    months since the first snapshot (see calendar_grid()).
+    """
+    fresh = increment[np.asarray(is_new)].copy()
+
+    first_date = fresh[project_col].map(existing.groupby(project_col)[date_col].min())
+    first_date = first_date.fillna(
+        fresh.groupby(project_col)[date_col].transform("min")
+    )
+    fresh["days_since_start"] = (fresh[date_col] - first_date).dt.days
+
+    if calendar:
+        fresh["month_number"] = (
+            month_index(fresh[date_col]) - month_index(first_date) + 1
+        )
+    else:
+        counts = existing.groupby(project_col).size()
+        offset = fresh[project_col].map(counts).fillna(0).astype(int)
+        fresh["month_number"] = offset + fresh.groupby(project_col).cumcount() + 1
+
+    existing = existing.copy()
+    updated = existing[project_col].isin(fresh[project_col].unique())
+    existing.loc[updated, "is_last_month"] = 0
+
+    combined = pd.concat([existing, fresh[existing.columns]], ignore_index=True)
+    return sort_project_blocks(combined, project_col, date_col)
+
+
+# Engineered feature tables are written as CSV or as Parquet (pyarrow),
+# chosen by the file suffix
+FEATURE_TABLE_FORMATS = (".parquet", ".csv")
+
+
+def _float32_round_trip(values, rtol=1e-6):
+    """
+    values as float32 if every finite value survives the round trip within
+    rtol (relative) and stays finite, else None.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(over="ignore"):
+        narrow = values.astype(np.float32)
+    finite = np.isfinite(values)
+    if not np.array_equal(finite, np.isfinite(narrow)):
+        return None
+    error = np.abs(narrow[finite].astype(np.float64) - values[finite])
+    if not np.all(error <= rtol * np.abs(values[finite])):
+        return None
+    return narrow
+
+
+def downcast_float_columns(df, exclude=(), rtol=1e-6):
+    """
+    Convert float64 columns to float32 where precision allows.
+
+    A column is converted when every finite value survives the float32
+    round trip within rtol (relative) and stays finite; columns in exclude
+    (e.g. raw metrics that must stay exact) are left as they are. Values
+    that already came from float32 convert back exactly, so downcasting is
+    idempotent.
+    """
+    converted = {}
+    for col in df.columns:
+        if col in exclude or df[col].dtype != np.float64:
+            continue
+        narrow = _float32_round_trip(df[col].to_numpy(), rtol)
+        if narrow is not None:
+            converted[col] = narrow
+
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def write_feature_table(df, path, project_col="project"):
+    """
+    Write an engineered feature table; the format follows the suffix.
+
+    Parquet stores project dictionary-encoded and date as a timestamp
+    column; CSV is written as before.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        df.assign(**{project_col: df[project_col].astype("category")}).to_parquet(
+            path, engine="pyarrow", index=False
+        )
+    else:
+        df.to_csv(path, index=False)
+
+
+def feature_table_columns(path):
+    """Column names of a feature table, without reading its data."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_feature_table(path, columns=None, date_col="date"):
+    """
+    Read (only the given columns of) a feature table.
+
+    Parquet columns are read selectively with their stored dtypes (float32
+    where downcast, categorical project); CSV is parsed with exact float
+    round trip. The date column is returned as datetime.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path, engine="pyarrow", columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns, float_precision="round_trip")
+    if date_col in df.columns:
+        df[date_col] = pd.to_datetime(df[date_col])
+    return df
+
+
+def latest_feature_table(stem):
+    """
+    Most recently written <stem>.parquet or <stem>.csv, so readers follow
+    whichever format temporal_feature_engineering.py wrote last.
+    """
+    candidates = [
+        Path(f"{stem}{suffix}")
+        for suffix in FEATURE_TABLE_FORMATS
+        if Path(f"{stem}{suffix}").exists()
+    ]
+    if not candidates:
+        raise FileNotFoundError(f"No feature table found for {stem}")
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+def iter_project_chunks(
+    path, chunk_rows=100_000, project_col="project", date_col="date"
+):
+    """
+    Read a long CSV in chunks of about chunk_rows rows that contain only
+    complete projects.
+
+    The file must be grouped by project (all rows of a project adjacent,
+    in any date order); the rows of the last project of every chunk are
+    carried into the next one. Each yielded frame is sorted by date within
+    project, keeping the input order of projects, so the output does not
+    depend on chunk_rows. Raises ValueError if a project reappears later.
+    """
+    seen = set()
+    carry = None
+
+    def finish(block):
+        projects = block[project_col].to_numpy()
+        run = np.cumsum(np.append(True, projects[1:] != projects[:-1]))
+        names = pd.unique(projects)
+        if run[-1] != len(names) or seen.intersection(names):
+            raise ValueError(f"{path} must be grouped by {project_col} for streaming")
+        seen.update(names)
+        block = block.assign(**{date_col: pd.to_datetime(block[date_col])})
+        order = np.lexsort((block[date_col].to_numpy(), run))
+        return block.iloc[order].reset_index(drop=True)
+
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        # The last project may continue in the next chunk
+        projects = chunk[project_col].to_numpy()
+        changes = np.flatnonzero(projects[1:] != projects[:-1])
+        tail_start = changes[-1] + 1 if len(changes) else 0
+        carry = chunk.iloc[tail_start:]
+        if tail_start:
+            yield finish(chunk.iloc[:tail_start])
+
+    if carry is not None and len(carry):
+        yield finish(carry)
+
+
+def _arrow_schema(block, exact_cols, project_col="project"):
+    """
+    Fixed Parquet schema of a streamed feature table, from its first block:
+    project as dictionary, raw metrics (exact_cols) as float64, derived
+    float features as float32 where downcast_float_columns() allows.
+    """
+    import pyarrow as pa
+
+    narrow = downcast_float_columns(block, exclude=exact_cols)
+    fields = []
+    for col in block.columns:
+        if col == project_col:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif col in exact_cols:
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.Schema.from_pandas(narrow[[col]], preserve_index=False)[
+                0
+            ].type
+        fields.append(pa.field(col, arrow_type))
+    return pa.schema(fields)
+
+
+def _arrow_table(block, schema):
+    """
+    Convert a feature block to schema (later blocks follow the first).
+
+    float32 columns get the same round-trip check as
+    downcast_float_columns(); raises ValueError if a later block has values
+    that no longer fit, since the file schema cannot change mid-stream.
+    """
+    import pyarrow as pa
+
+    columns = []
+    misfits = []
+    for field_ in schema:
+        values = block[field_.name]
+        if pa.types.is_dictionary(field_.type):
+            array = pa.array(values.astype(str).to_numpy()).dictionary_encode()
+            array = array.cast(field_.type)
+        elif field_.type == pa.float32():
+            narrow = _float32_round_trip(values.to_numpy(dtype=np.float64))
+            if narrow is None:
+                misfits.append(field_.name)
+                continue
+            array = pa.array(narrow)
+        elif pa.types.is_floating(field_.type):
+            array = pa.array(values.to_numpy(dtype=np.float64))
+        else:
+            array = pa.array(values, type=field_.type, from_pandas=True)
+        columns.append(array)
+    if misfits:
+        raise ValueError(
+            "Streamed chunk no longer fits the float32 schema of the first "
+            f"chunk in columns: {', '.join(misfits)} (write without --stream)"
+        )
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def stream_temporal_features(
+    input_path,
+    output_path,
+    plan,
+    chunk_rows=100_000,
+    calendar=False,
+    workers=1,
+    targets=(),
+):
+    """
+    Out-of-core engineer_temporal_block() over a long CSV grouped by project.
+
+    Chunks of complete projects (iter_project_chunks()) are engineered one
+    at a time and appended as row groups to a Parquet file, so peak memory
+    follows chunk_rows rather than the history length. The schema is fixed
+    by the first chunk (see _arrow_schema()); a later chunk whose float32
+    columns lose precision raises ValueError and removes the partial
+    file. If targets are given, the
+    pairwise-complete feature-target correlation moments are accumulated
+    across chunks (matrix_stats.PairwiseCorrelation).
+
+    Returns a dict with rows, projects, columns and the accumulated
+    correlation (or None).
+    """
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    screen = PairwiseCorrelation() if targets else None
+    rows = 0
+    projects = 0
+
+    try:
+        for chunk in iter_project_chunks(input_path, chunk_rows):
+            numeric_cols = [c for c in chunk.columns if c not in ("project", "date")]
+            block = engineer_temporal_block(
+                chunk, numeric_cols, plan, calendar, workers
+            )
+
+            if writer is None:
+                schema = _arrow_schema(block, numeric_cols)
+                writer = pq.ParquetWriter(output_path, schema)
+            writer.write_table(_arrow_table(block, schema))
+
+            if screen is not None:
+                features = [c for c in block.columns if c not in ("project", "date")]
+                screen.update(block[features], block[list(targets)])
+
+            rows += len(block)
+            projects += block["project"].nunique()
+    except BaseException:
+        # Do not leave a truncated table that looks complete
+        if writer is not None:
+            writer.close()
+            Path(output_path).unlink(missing_ok=True)
+        raise
+    if writer is not None:
+        writer.close()
+
+    return {
+        "rows": rows,
+        "projects": projects,
+        "columns": list(schema.names) if schema is not None else [],
+        "screen": screen,
+    }
@@ -20,6 +20,12 @@ import seaborn as sns
 from statsmodels.tsa.arima.model import ARIMA
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
+from temporal_features import (
+    feature_table_columns,
+    latest_feature_table,
+    read_feature_table,
+)
+
 warnings.filterwarnings("ignore")
 
 # Налаштування візуалізації
@@ -38,21 +44,26 @@ print("=" * 80)
 # 1. LOAD TEMPORAL DATA WITH ENGINEERED FEATURES
 # ============================================================================
 print("\n📊 Завантаження temporal data...")
-df = pd.read_csv("../reports/temporal/engineered_features_temporal.csv")
-df["date"] = pd.to_datetime(df["date"])
 
-print(f"✅ Завантажено {len(df)} records")
+# Parquet or CSV, whichever temporal_feature_engineering.py wrote last;
+# each stage reads only the columns it uses
+features_path = latest_feature_table("../reports/temporal/engineered_features_temporal")
+all_columns = feature_table_columns(features_path)
+
+# Key metrics to forecast
+forecast_metrics = ["dx_codeReviewDuration", "bi_timeToMarket", "bi_communityGrowth"]
+
+df = read_feature_table(features_path, ["project", "date"] + forecast_metrics)
+
+print(f"✅ Завантажено {len(df)} records ({features_path.name})")
 print(f"   Projects: {df['project'].nunique()}")
-print(f"   Features: {len(df.columns) - 2}")  # -2 for project, date
+print(f"   Features: {len(all_columns) - 2}")  # -2 for project, date
 
 # ============================================================================
 # 2. TIME-SERIES FORECASTING (ARIMA)
 # ============================================================================
 print("\n📈 ARIMA Forecasting для key metrics...")
 
-# Key metrics to forecast
-forecast_metrics = ["dx_codeReviewDuration", "bi_timeToMarket", "bi_communityGrowth"]
-
 arima_results = []
 
 for metric in forecast_metrics:
@@ -115,12 +126,11 @@ print("\n📊 Temporal Cross-Validation (Time Series Split)...")
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.ensemble import RandomForestRegressor
 
+targets = ["bi_timeToMarket", "bi_communityGrowth"]
+
 # Use engineered temporal features to predict targets
-feature_cols = [
-    col
-    for col in df.columns
-    if col not in ["project", "date", "bi_timeToMarket", "bi_communityGrowth"]
-]
+feature_cols = [col for col in all_columns if col not in ["project", "date"] + targets]
+df = read_feature_table(features_path, targets + feature_cols)
 
 # Filter out columns with all NaN or non-numeric
 feature_cols = [
@@ -129,8 +139,6 @@ feature_cols = [
     if df[col].notna().sum() > 0 and pd.api.types.is_numeric_dtype(df[col])
 ]
 
-targets = ["bi_timeToMarket", "bi_communityGrowth"]
-
 cv_results = []
 
 for target in targets:
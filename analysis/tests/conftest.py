@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The analysis modules are flat scripts, not a package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,185 @@
+import json
+import math
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from predict import (
+    ENGINEERED_FEATURES,
+    LinearKernel,
+    activate_version,
+    engineer_features,
+    engineer_features_columnar,
+    export_linear_kernel,
+    load_models,
+    predict,
+    predict_batch,
+    raw_metrics_matrix,
+    sweep_axis_values,
+)
+
+PREDICT_SCRIPT = Path(__file__).resolve().parents[1] / "predict.py"
+
+
+def run_cli(*args):
+    result = subprocess.run(
+        [sys.executable, str(PREDICT_SCRIPT), *args], capture_output=True, text=True
+    )
+    return result.returncode, json.loads(result.stdout)
+
+
+METRICS_REPORT = PREDICT_SCRIPT.parent / ".." / "reports" / "metrics_report.json"
+
+# engineer_features() uses math.log1p and the columnar path np.log1p, which
+# may differ by an ulp; everything else is computed identically
+ENGINE_RTOL = 1e-15
+ENGINE_ATOL = 1e-15
+
+
+@pytest.fixture(scope="module")
+def kernel_models():
+    models, scalers, feature_list, metadata = load_models()
+    if models is None:
+        pytest.skip(metadata["error"])
+    if not isinstance(models, LinearKernel):
+        # sklearn rejects NaN inputs; only the kernel scores them
+        pytest.skip("no exported linear kernel")
+    return models, scalers, feature_list
+
+
+def test_log_features_follow_numpy_domain():
+    features = engineer_features(
+        {
+            "developerExperience": {"codeReviewDuration": -5},
+            "technicalPerformance": {"bundleSize": -1},
+        }
+    )
+
+    assert math.isnan(features["dx_codeReviewDuration_log"])
+    assert features["tp_bundleSize_log"] == float("-inf")
+
+
+def test_negative_metric_single_and_batch_agree(kernel_models):
+    metrics = {
+        "developerExperience": {"codeReviewDuration": -5, "buildTime": 3},
+        "technicalPerformance": {"testCoverage": 70, "bundleSize": 200},
+    }
+
+    single, _ = predict(metrics, *kernel_models)
+    (batch,) = predict_batch([metrics], *kernel_models)
+
+    for target, value in single.items():
+        assert math.isnan(value)
+        assert math.isnan(batch["predictions"][target])
+
+
+@pytest.mark.parametrize(
+    "args", [["--cache-size"], ["--cache-size", "many"], ["--cache-size", "0"]]
+)
+def test_cli_rejects_bad_cache_size(args):
+    returncode, output = run_cli('{"developerExperience": {}}', *args)
+
+    assert returncode == 1
+    assert output == {"error": "--cache-size requires a positive integer"}
+
+
+def test_cli_cache_size_without_cache_file(kernel_models):
+    returncode, output = run_cli(
+        "--cache-size", "10", '{"developerExperience": {"codeReviewDuration": 5}}'
+    )
+
+    assert returncode == 0
+    assert output["type"] == "prediction"
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        5,
+        "12..96",
+        {"num": 3},
+        {"start": 1, "stop": 2},
+        {"start": "a", "stop": 2, "num": 3},
+        ["x", 1],
+    ],
+)
+def test_malformed_sweep_axis_raises_value_error(spec):
+    with pytest.raises(ValueError, match="Invalid sweep axis"):
+        sweep_axis_values(spec)
+
+
+def test_sweep_axis_values():
+    assert list(sweep_axis_values([60, 80])) == [60.0, 80.0]
+    assert list(sweep_axis_values({"start": 0, "stop": 1, "num": 3})) == [0, 0.5, 1]
+    assert list(sweep_axis_values({"start": 1, "stop": 3, "step": 1})) == [1, 2, 3]
+
+
+def test_cli_reports_malformed_sweep_as_json_error(kernel_models):
+    returncode, output = run_cli('{"metrics": {}, "sweep": {"tp_testCoverage": 5}}')
+
+    assert returncode == 1
+    assert output == {"error": "Invalid sweep axis: 5"}
+
+
+def test_export_kernel_targets_active_version(tmp_path):
+    legacy = PREDICT_SCRIPT.parent / ".." / "reports" / "ml" / "saved_models"
+    if not (legacy / "metadata.json").exists():
+        pytest.skip("no saved models")
+    models = [p for p in legacy.iterdir() if p.suffix in (".json", ".joblib")]
+    for version in ("v1", "v2"):
+        version_dir = tmp_path / "versions" / version
+        version_dir.mkdir(parents=True)
+        for path in models:
+            if not path.name.startswith("linear_kernel"):
+                shutil.copy(path, version_dir / path.name)
+    activate_version("v1", tmp_path)
+
+    active_path = export_linear_kernel(models_root=tmp_path)
+    pinned_path = export_linear_kernel(version="v2", models_root=tmp_path)
+
+    assert active_path.parent == tmp_path / "versions" / "v1"
+    assert pinned_path.parent == tmp_path / "versions" / "v2"
+    assert not (tmp_path / "linear_kernel.npz").exists()
+
+
+def edge_case_projects():
+    return [
+        {},
+        {
+            "developerExperience": {"codeReviewDuration": -5, "buildTime": -1},
+            "technicalPerformance": {"bundleSize": -1, "testCoverage": -20},
+            "businessImpact": {"changeFailureRate": -0.5},
+        },
+        {
+            "developerExperience": {"codeReviewDuration": float("nan")},
+            "technicalPerformance": {"bundleSize": float("nan"), "testCoverage": 80},
+        },
+        {
+            "developerExperience": {"codeReviewDuration": 0, "buildTime": None},
+            "businessImpact": {"activeContributors": float("inf")},
+        },
+    ]
+
+
+def test_columnar_engine_matches_scalar_engine():
+    if not METRICS_REPORT.exists():
+        pytest.skip("no metrics_report.json")
+    with open(METRICS_REPORT) as f:
+        projects = json.load(f)["projects"] + edge_case_projects()
+
+    columnar = engineer_features_columnar(raw_metrics_matrix(projects))
+    scalar = np.array(
+        [
+            [engineer_features(project)[name] for name in ENGINEERED_FEATURES]
+            for project in projects
+        ],
+        dtype=float,
+    )
+
+    np.testing.assert_allclose(
+        columnar, scalar, rtol=ENGINE_RTOL, atol=ENGINE_ATOL, equal_nan=True
+    )
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from resampling import _leave_one_out_index, bootstrap, mediation_paths
+
+
+@pytest.mark.parametrize("n, size", [(1, 4), (7, 3), (10, 10), (101, 25)])
+def test_leave_one_out_batches_match_dense_jackknife(n, size):
+    dense = np.array([np.delete(np.arange(n), i) for i in range(n)])
+    batches = [_leave_one_out_index(n, start, size) for start in range(0, n, size)]
+
+    assert all(len(batch) <= size for batch in batches)
+    np.testing.assert_array_equal(np.vstack(batches).reshape(dense.shape), dense)
+
+
+def test_bca_bootstrap_with_small_jackknife_batches():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=120)
+    m = 0.5 * x + rng.normal(size=120)
+    y = 0.4 * m + rng.normal(size=120)
+
+    boot = bootstrap(
+        mediation_paths,
+        np.column_stack([x, m, y]),
+        n_resamples=400,
+        seed=0,
+        batch_size=32,
+    )
+
+    assert boot["replicates"].shape == (400, 5)
+    assert np.all(boot["ci_lower"] <= boot["estimate"])
+    assert np.all(boot["estimate"] <= boot["ci_upper"])
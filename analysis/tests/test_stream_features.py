@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from temporal_features import (
+    TemporalFeatureSpec,
+    plan_temporal_features,
+    stream_temporal_features,
+)
+
+pytest.importorskip("pyarrow")
+
+
+def long_csv(path, values):
+    """Long table with 6 monthly snapshots per project."""
+    n_projects = len(values) // 6
+    pd.DataFrame(
+        {
+            "project": np.repeat([f"p{i}" for i in range(n_projects)], 6),
+            "date": np.tile(
+                pd.date_range("2023-01-01", periods=6, freq="MS"), n_projects
+            ),
+            "metric": values,
+        }
+    ).to_csv(path, index=False)
+
+
+def test_stream_writes_float32_features(tmp_path):
+    rng = np.random.default_rng(0)
+    long_csv(tmp_path / "long.csv", rng.integers(0, 100, 24).astype(float))
+
+    summary = stream_temporal_features(
+        tmp_path / "long.csv",
+        tmp_path / "features.parquet",
+        plan_temporal_features(TemporalFeatureSpec()),
+        chunk_rows=6,
+    )
+
+    table = pd.read_parquet(tmp_path / "features.parquet")
+    assert summary["rows"] == len(table) == 24
+    assert table["metric"].dtype == np.float64
+    assert table["metric_lag_1m"].dtype == np.float32
+
+
+def test_stream_rejects_chunk_that_no_longer_fits_float32(tmp_path):
+    # The first chunk fits float32; the second overflows it in derived
+    # features, so the fixed schema cannot hold it
+    values = np.concatenate([np.arange(6.0), np.full(6, 1e39)])
+    long_csv(tmp_path / "long.csv", values)
+    output = tmp_path / "features.parquet"
+
+    with pytest.raises(ValueError, match="metric_lag_1m"):
+        stream_temporal_features(
+            tmp_path / "long.csv",
+            output,
+            plan_temporal_features(TemporalFeatureSpec()),
+            chunk_rows=6,
+        )
+    assert not output.exists()
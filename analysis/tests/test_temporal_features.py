@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from temporal_features import (
+    TemporalFeatureSpec,
+    compute_calendar_features,
+    month_index,
+    plan_temporal_features,
+    project_positions,
+    rolling_trend,
+)
+
+WINDOWS = (2, 3, 6, 12)
+
+
+def polyfit_trend(series):
+    """Reference slope of one window: np.polyfit over the non-NaN points."""
+    y = series.to_numpy()
+    x = np.arange(len(y))
+    mask = ~np.isnan(y)
+    if mask.sum() < 2:
+        return np.nan
+    return np.polyfit(x[mask], y[mask], 1)[0]
+
+
+def reference_trends(df, col, window, min_periods=2):
+    return (
+        df.groupby("project", sort=False)[col]
+        .rolling(window=window, min_periods=min_periods)
+        .apply(polyfit_trend, raw=False)
+        .reset_index(level=0, drop=True)
+        .reindex(df.index)
+        .to_numpy()
+    )
+
+
+def project_frame(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    projects = np.repeat([f"p{i}" for i in range(len(lengths))], lengths)
+    n = len(projects)
+    return pd.DataFrame(
+        {
+            "project": projects,
+            "trend_up": np.arange(n) * 0.5 + rng.normal(0, 1, n),
+            "noise": rng.normal(100, 25, n),
+            "large": rng.normal(1e6, 1e4, n),
+        }
+    )
+
+
+def with_nans(df, pattern, seed=0):
+    df = df.copy()
+    rng = np.random.default_rng(seed)
+    cols = ["trend_up", "noise", "large"]
+    if pattern == "random":
+        for col in cols:
+            df.loc[rng.random(len(df)) < 0.2, col] = np.nan
+    elif pattern == "leading":
+        # First rows of every project missing (metric collected later)
+        position = project_positions(df["project"])
+        df.loc[position < 4, cols] = np.nan
+    elif pattern == "sparse":
+        # Mostly missing: many windows have fewer than two points
+        for col in cols:
+            df.loc[rng.random(len(df)) < 0.7, col] = np.nan
+    elif pattern == "empty_project":
+        df.loc[df["project"] == "p1", cols] = np.nan
+    return df
+
+
+@pytest.mark.parametrize(
+    "pattern", ["none", "random", "leading", "sparse", "empty_project"]
+)
+def test_rolling_trend_matches_polyfit(pattern):
+    df = with_nans(project_frame([1, 5, 14, 30, 2, 25]), pattern)
+    cols = ["trend_up", "noise", "large"]
+    position = project_positions(df["project"])
+
+    trends = rolling_trend(df[cols].to_numpy(), position, WINDOWS)
+
+    for window in WINDOWS:
+        for j, col in enumerate(cols):
+            expected = reference_trends(df, col, window)
+            fast = trends[window][:, j]
+            np.testing.assert_array_equal(np.isnan(fast), np.isnan(expected))
+            scale = max(1.0, np.nanmax(np.abs(df[col])))
+            np.testing.assert_allclose(fast, expected, rtol=1e-7, atol=1e-9 * scale)
+
+
+def test_rolling_trend_min_periods():
+    df = with_nans(project_frame([20, 9], seed=1), "random", seed=1)
+    position = project_positions(df["project"])
+
+    trends = rolling_trend(df[["noise"]].to_numpy(), position, (6,), min_periods=4)
+
+    expected = reference_trends(df, "noise", 6, min_periods=4)
+    np.testing.assert_allclose(trends[6][:, 0], expected, rtol=1e-7, atol=1e-9)
+
+
+def test_calendar_trend_matches_polyfit_on_dense_grid():
+    # Gappy monthly snapshots: the reference fills missing months with NaN,
+    # so x is the calendar month offset inside each window
+    rng = np.random.default_rng(2)
+    frames = []
+    for i, span in enumerate([1, 8, 20, 36]):
+        months = pd.date_range("2022-01-01", periods=span, freq="MS")
+        keep = rng.random(span) < 0.6
+        keep[0] = keep[-1] = True
+        months = months[keep]
+        frames.append(
+            pd.DataFrame(
+                {
+                    "project": f"p{i}",
+                    "date": months,
+                    "value": rng.normal(50, 10, len(months)),
+                }
+            )
+        )
+    df = pd.concat(frames, ignore_index=True)
+    df.loc[rng.random(len(df)) < 0.1, "value"] = np.nan
+
+    spec = TemporalFeatureSpec(trend_windows=WINDOWS)
+    features = compute_calendar_features(
+        df[["value"]].to_numpy(),
+        df["project"],
+        month_index(df["date"]),
+        plan_temporal_features(spec),
+        ["value"],
+    )
+
+    dense = (
+        df.set_index("date")
+        .groupby("project", group_keys=False)
+        .apply(lambda g: g.asfreq("MS").assign(project=g.name))
+        .reset_index()
+    )
+    assert len(dense) > len(df)
+    for window in WINDOWS:
+        dense["expected"] = reference_trends(dense, "value", window)
+        expected = df[["project", "date"]].merge(dense, how="left")["expected"]
+        np.testing.assert_allclose(
+            features[f"value_trend_{window}m"], expected, rtol=1e-7, atol=1e-9
+        )
@@ -11,12 +11,20 @@ Train and Save ML Models
 - timeToMarket: Lasso
 - communityGrowth: Lasso
 
+Кожен запуск пише у незмінну директорію saved_models/versions/<id>,
+де <id> - хеш даних та конфігурації, після чого атомарно перемикає
+вказівник saved_models/ACTIVE на нову версію.
+
 Магістерська робота: Outcome-based оцінка якості TypeScript коду
 Автор: Слабенко Костянтин Олегович
 Група: АС-202
 Одеський політехнічний національний університет
 """
 
+import os
+import json
+import shutil
+import hashlib
 import warnings
 from pathlib import Path
 import pandas as pd
@@ -28,13 +36,20 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LinearRegression, Lasso
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
 
+from matrix_stats import redundant_features
+
 warnings.filterwarnings("ignore")
 
 # Directories
 REPORTS_DIR = Path("../reports")
 ML_DIR = REPORTS_DIR / "ml"
 MODELS_DIR = ML_DIR / "saved_models"
-MODELS_DIR.mkdir(exist_ok=True)
+VERSIONS_DIR = MODELS_DIR / "versions"
+VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Artifacts are written to a private staging directory and published as
+# versions/<id> once complete (see section 7)
+STAGING_DIR = VERSIONS_DIR / f".staging-{os.getpid()}"
 
 print("=" * 80)
 print("TRAIN AND SAVE ML MODELS")
@@ -46,7 +61,8 @@ print()
 # ============================================================================
 print("1. Loading data...")
 
-df = pd.read_csv(REPORTS_DIR / "statistical" / "engineered_features.csv")
+data_path = REPORTS_DIR / "statistical" / "engineered_features.csv"
+df = pd.read_csv(data_path)
 print(f"   Loaded: {df.shape[0]} projects x {df.shape[1]} features")
 
 # Remove non-features
@@ -78,13 +94,10 @@ for col in feature_cols:
 feature_cols = [col for col in feature_cols if col not in leaked_features]
 print(f"   After removing leaked: {len(feature_cols)} features")
 
-# Remove highly correlated features
-corr_matrix = df[feature_cols].corr().abs()
-upper_triangle = corr_matrix.where(
-    np.triu(np.ones(corr_matrix.shape), k=1).astype(bool)
-)
+# Remove highly correlated features (later column of every pair with
+# |r| > 0.95; the correlation matrix is streamed in tiles)
 to_drop = [
-    column for column in upper_triangle.columns if any(upper_triangle[column] > 0.95)
+    feature_cols[k] for k in redundant_features(df[feature_cols], threshold=0.95)
 ]
 feature_cols = [col for col in feature_cols if col not in to_drop]
 
@@ -117,131 +130,188 @@ for norm_col in scaled_features["norm"]:
 feature_cols = features_to_keep
 print(f"   Final features: {len(feature_cols)}")
 
-# Save feature list for prediction script
-feature_list_path = MODELS_DIR / "feature_list.json"
-import json
-
-with open(feature_list_path, "w") as f:
-    json.dump(feature_cols, f, indent=2)
-print(f"   Saved feature list to {feature_list_path}")
-
-# ============================================================================
-# 3. PREPARE DATA
-# ============================================================================
-print("\n3. Preparing data...")
-
-X = df[feature_cols].copy()
-y_overall = df["overallScore"].copy()
-y_time_to_market = df["bi_timeToMarket"].copy()
-y_community = df["bi_communityGrowth"].copy()
-
-# Train/test split
-random_state = 42
-test_size = 0.15
-
-# ============================================================================
-# 4. TRAIN AND SAVE MODELS
-# ============================================================================
-print("\n4. Training and saving models...")
-
-# Model configurations based on best performers from ml_modeling.py
-model_configs = {
-    "overallScore": {
-        "model": LinearRegression(),
-        "y": y_overall,
-        "needs_scaling": False,
-    },
-    "timeToMarket": {
-        "model": Lasso(alpha=0.1, random_state=random_state),
-        "y": y_time_to_market,
-        "needs_scaling": True,
-    },
-    "communityGrowth": {
-        "model": Lasso(alpha=0.1, random_state=random_state),
-        "y": y_community,
-        "needs_scaling": True,
-    },
-}
-
-# Train and save each model
-for target_name, config in model_configs.items():
-    print(f"\n   Training {target_name}...")
-
-    # Split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, config["y"], test_size=test_size, random_state=random_state
-    )
-
-    # Scale if needed
-    scaler = None
-    if config["needs_scaling"]:
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        X_tr = X_train_scaled
-        X_te = X_test_scaled
-    else:
-        X_tr = X_train
-        X_te = X_test
-
-    # Train
-    model = config["model"]
-    model.fit(X_tr, y_train)
-
-    # Evaluate
-    y_pred = model.predict(X_te)
-    r2 = r2_score(y_test, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-    mae = mean_absolute_error(y_test, y_pred)
-
-    print(f"      Test R²: {r2:.4f}, RMSE: {rmse:.4f}, MAE: {mae:.4f}")
-
-    # Save model
-    model_path = MODELS_DIR / f"{target_name}_model.joblib"
-    joblib.dump(model, model_path)
-    print(f"      Saved model to {model_path}")
-
-    # Save scaler if used
-    if scaler is not None:
-        scaler_path = MODELS_DIR / f"{target_name}_scaler.joblib"
-        joblib.dump(scaler, scaler_path)
-        print(f"      Saved scaler to {scaler_path}")
-
-# ============================================================================
-# 5. SAVE METADATA
-# ============================================================================
-print("\n5. Saving metadata...")
-
-metadata = {
-    "targets": ["overallScore", "timeToMarket", "communityGrowth"],
-    "feature_count": len(feature_cols),
-    "training_samples": len(X_train),
-    "test_samples": len(X_test),
-    "models": {
+# Nothing is written before this point; a failed run removes its
+# staging directory instead of leaving it under versions/
+shutil.rmtree(STAGING_DIR, ignore_errors=True)
+STAGING_DIR.mkdir()
+try:
+    # Save feature list for prediction script
+    feature_list_path = STAGING_DIR / "feature_list.json"
+
+    with open(feature_list_path, "w") as f:
+        json.dump(feature_cols, f, indent=2)
+    print(f"   Saved feature list to {feature_list_path}")
+
+    # ========================================================================
+    # 3. PREPARE DATA
+    # ========================================================================
+    print("\n3. Preparing data...")
+
+    X = df[feature_cols].copy()
+    y_overall = df["overallScore"].copy()
+    y_time_to_market = df["bi_timeToMarket"].copy()
+    y_community = df["bi_communityGrowth"].copy()
+
+    # Train/test split
+    random_state = 42
+    test_size = 0.15
+
+    # ========================================================================
+    # 4. TRAIN AND SAVE MODELS
+    # ========================================================================
+    print("\n4. Training and saving models...")
+
+    # Model configurations based on best performers from ml_modeling.py
+    model_configs = {
         "overallScore": {
-            "type": "LinearRegression",
+            "model": LinearRegression(),
+            "y": y_overall,
             "needs_scaling": False,
         },
         "timeToMarket": {
-            "type": "Lasso",
+            "model": Lasso(alpha=0.1, random_state=random_state),
+            "y": y_time_to_market,
             "needs_scaling": True,
         },
         "communityGrowth": {
-            "type": "Lasso",
+            "model": Lasso(alpha=0.1, random_state=random_state),
+            "y": y_community,
             "needs_scaling": True,
         },
-    },
-}
+    }
+
+    # Train and save each model
+    for target_name, config in model_configs.items():
+        print(f"\n   Training {target_name}...")
+
+        # Split
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, config["y"], test_size=test_size, random_state=random_state
+        )
+
+        # Scale if needed
+        scaler = None
+        if config["needs_scaling"]:
+            scaler = StandardScaler()
+            X_train_scaled = scaler.fit_transform(X_train)
+            X_test_scaled = scaler.transform(X_test)
+            X_tr = X_train_scaled
+            X_te = X_test_scaled
+        else:
+            X_tr = X_train
+            X_te = X_test
+
+        # Train
+        model = config["model"]
+        model.fit(X_tr, y_train)
+
+        # Evaluate
+        y_pred = model.predict(X_te)
+        r2 = r2_score(y_test, y_pred)
+        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+        mae = mean_absolute_error(y_test, y_pred)
+
+        print(f"      Test R²: {r2:.4f}, RMSE: {rmse:.4f}, MAE: {mae:.4f}")
+
+        # Save model
+        model_path = STAGING_DIR / f"{target_name}_model.joblib"
+        joblib.dump(model, model_path)
+        print(f"      Saved model to {model_path}")
+
+        # Save scaler if used
+        if scaler is not None:
+            scaler_path = STAGING_DIR / f"{target_name}_scaler.joblib"
+            joblib.dump(scaler, scaler_path)
+            print(f"      Saved scaler to {scaler_path}")
+
+    # ========================================================================
+    # 5. SAVE METADATA
+    # ========================================================================
+    print("\n5. Saving metadata...")
+
+    metadata = {
+        "targets": ["overallScore", "timeToMarket", "communityGrowth"],
+        "feature_count": len(feature_cols),
+        "training_samples": len(X_train),
+        "test_samples": len(X_test),
+        "models": {
+            "overallScore": {
+                "type": "LinearRegression",
+                "needs_scaling": False,
+            },
+            "timeToMarket": {
+                "type": "Lasso",
+                "needs_scaling": True,
+            },
+            "communityGrowth": {
+                "type": "Lasso",
+                "needs_scaling": True,
+            },
+        },
+    }
+
+    # Version id: hash of the training data and the full training config
+    config = {
+        "features": feature_cols,
+        "random_state": random_state,
+        "test_size": test_size,
+        "models": {
+            name: {
+                "type": type(cfg["model"]).__name__,
+                "params": cfg["model"].get_params(),
+                "needs_scaling": cfg["needs_scaling"],
+            }
+            for name, cfg in model_configs.items()
+        },
+    }
+    version_hash = hashlib.sha256(data_path.read_bytes())
+    version_hash.update(json.dumps(config, sort_keys=True, default=str).encode())
+    version = version_hash.hexdigest()[:12]
+    metadata["version"] = version
+
+    metadata_path = STAGING_DIR / "metadata.json"
+    with open(metadata_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+    print(f"   Saved metadata to {metadata_path}")
+
+    # ========================================================================
+    # 6. EXPORT LINEAR KERNEL
+    # ========================================================================
+    print("\n6. Exporting linear kernel...")
+
+    # All models are linear: fold scalers into coefficients so predict.py can
+    # score every target with one matrix multiply, without unpickling sklearn
+    from predict import export_linear_kernel
+
+    kernel_path = export_linear_kernel(STAGING_DIR)
+    print(f"   Saved linear kernel to {kernel_path}")
+
+    # ========================================================================
+    # 7. PUBLISH VERSION
+    # ========================================================================
+    print("\n7. Publishing model version...")
+
+    from predict import activate_version
+
+    version_dir = VERSIONS_DIR / version
+    if version_dir.exists():
+        # Same data and config were trained before: keep the published copy
+        shutil.rmtree(STAGING_DIR)
+        print(f"   Version {version} already exists, reusing it")
+    else:
+        os.rename(STAGING_DIR, version_dir)
+        print(f"   Saved version to {version_dir}")
 
-metadata_path = MODELS_DIR / "metadata.json"
-with open(metadata_path, "w") as f:
-    json.dump(metadata, f, indent=2)
-print(f"   Saved metadata to {metadata_path}")
+    activate_version(version, MODELS_DIR)
+    print(f"   ACTIVE -> {version}")
+finally:
+    # Already renamed to versions/<id> when publishing succeeded
+    shutil.rmtree(STAGING_DIR, ignore_errors=True)
 
 print("\n" + "=" * 80)
 print("MODELS SAVED SUCCESSFULLY")
 print("=" * 80)
-print(f"\nModels saved to: {MODELS_DIR}")
+print(f"\nModels saved to: {version_dir} (active version {version})")
 print("Files:")
 print("  - feature_list.json")
 print("  - metadata.json")
@@ -250,3 +320,5 @@ print("  - timeToMarket_model.joblib")
 print("  - timeToMarket_scaler.joblib")
 print("  - communityGrowth_model.joblib")
 print("  - communityGrowth_scaler.joblib")
+print("  - linear_kernel.npz")
+print("  - linear_kernel.json")
@@ -138,7 +138,10 @@ function callMLPrediction(metrics) {
       __dirname,
       '../../../reports/ml/saved_models'
     );
-    if (!fs.existsSync(path.join(modelsDir, 'metadata.json'))) {
+    if (
+      !fs.existsSync(path.join(modelsDir, 'metadata.json')) &&
+      !fs.existsSync(path.join(modelsDir, 'ACTIVE'))
+    ) {
       return { error: 'Models not found. Run train_and_save_models.py first.' };
     }
 
@@ -172,7 +175,10 @@ function callWhatIfAnalysis(metrics, changes) {
       __dirname,
       '../../../reports/ml/saved_models'
     );
-    if (!fs.existsSync(path.join(modelsDir, 'metadata.json'))) {
+    if (
+      !fs.existsSync(path.join(modelsDir, 'metadata.json')) &&
+      !fs.existsSync(path.join(modelsDir, 'ACTIVE'))
+    ) {
       return { error: 'Models not found. Run train_and_save_models.py first.' };
     }
 